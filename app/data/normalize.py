@@ -109,6 +109,8 @@ _CATEGORY_KEYWORDS: Dict[str, tuple[str, ...]] = {
     "managed": ("rds", "database", "sql", "dynamodb", "aurora", "redis", "elasticache", "managed", "api gateway", "kubernetes", "queue"),
 }
 
+_CATEGORY_ORDER = (*_CATEGORY_KEYWORDS, "other")
+
 _DEFAULT_ACCOUNT_SCOPE = {
     "AWS": "aws_account",
     "OCI": "oci_compartment",
@@ -162,11 +164,40 @@ def normalize_costs(df: pd.DataFrame, cloud_provider: str) -> pd.DataFrame:
     )
 
     month_period = normalized["usage_date"].dt.to_period("M")
-    normalized["month"] = month_period.astype(str)
-    normalized.loc[normalized["usage_date"].isna(), "month"] = "Sem data"
+    # Rótulos de mês materializados uma única vez por período distinto: as
+    # linhas carregam códigos inteiros (Categorical), não uma string cada.
+    # sort=True deixa as categorias em ordem cronológica ("YYYY-MM")
+    month_codes, month_uniques = pd.factorize(month_period, sort=True)
+    month_cat = pd.Categorical.from_codes(month_codes, categories=[str(period) for period in month_uniques])
+    normalized["month"] = month_cat
+    if (month_codes == -1).any():
+        normalized["month"] = normalized["month"].cat.add_categories(["Sem data"]).fillna("Sem data")
     normalized["service_category"] = normalized["service_name"].apply(lambda name: categorize_service(name, cloud))
 
+    # Dtype categórico: os groupbys de analytics passam a operar sobre códigos
+    # inteiros pré-computados em vez de rehashear strings a cada chamada.
+    # Categorias fixas para provider/categoria mantêm o dtype estável num concat.
+    providers = list(_DEFAULT_ACCOUNT_SCOPE)
+    if cloud not in providers:
+        providers.append(cloud)
+    normalized["cloud_provider"] = pd.Categorical(normalized["cloud_provider"], categories=providers)
+    normalized["service_category"] = pd.Categorical(normalized["service_category"], categories=_CATEGORY_ORDER)
+    normalized["service_name"] = normalized["service_name"].astype("category")
+    # account_scope/region também alimentam filtros da UI: como categóricos,
+    # a lista de opções sai de .cat.categories sem unique+sort por rerun
+    normalized["account_scope"] = normalized["account_scope"].astype("category")
+    normalized["region"] = normalized["region"].astype("category")
+
     normalized = normalized[list(CANONICAL_COLUMNS)]
+    # Chave de ordenação mensal pré-computada: as funções de analytics
+    # reaproveitam esta coluna em vez de reparsear datas a cada chamada
+    normalized["month_sort"] = month_period.dt.to_timestamp()
+    # Ingestão pré-ordenada por data: janelas temporais viram slices e a UI
+    # não precisa reordenar por rerun (mergesort é estável, preservando a
+    # ordem de entrada entre linhas do mesmo dia). O marcador em attrs
+    # permite que consumidores pulem o sort com segurança.
+    normalized = normalized.sort_values("usage_date", kind="mergesort", ignore_index=True)
+    normalized.attrs["sorted_by"] = "usage_date"
     return normalized
 
 
@@ -53,6 +53,23 @@ class KPISummary(BaseModel):
     peak_service: Optional[str] = None
     lowest_service: Optional[str] = None
 
+    def as_cache_key(self) -> tuple:
+        """Pares (campo, valor) como tupla imutável e hasheável.
+
+        Mais barato que .dict() como chave de cache: são só os oito
+        escalares, sem alocar dicionário por rerun.
+        """
+        return (
+            ("total_cost", self.total_cost),
+            ("average_cost", self.average_cost),
+            ("max_cost", self.max_cost),
+            ("min_cost", self.min_cost),
+            ("peak_month", self.peak_month),
+            ("lowest_month", self.lowest_month),
+            ("peak_service", self.peak_service),
+            ("lowest_service", self.lowest_service),
+        )
+
 
 class ForecastResult(BaseModel):
     """Resultado de previsão de custos."""
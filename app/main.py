@@ -188,6 +188,10 @@ def load_multicloud_normalized_data(file_payload: Tuple[Tuple[int, str, str, str
         return pd.DataFrame(columns=CANONICAL_COLUMNS)
 
     combined = pd.concat(frames, ignore_index=True)
+    # O concat intercala arquivos individualmente ordenados; reordena e
+    # re-marca para que os consumidores de attrs["sorted_by"] pulem o sort
+    combined = combined.sort_values("usage_date", kind="mergesort", ignore_index=True)
+    combined.attrs["sorted_by"] = "usage_date"
     return combined
 
 
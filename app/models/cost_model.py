@@ -281,10 +281,8 @@ def _legacy_column_mapping() -> Dict[str, str]:
     """Mapear colunas normalizadas antigas (snake case) para nomes exibidos."""
 
     def _normalize_db_column(name: str) -> str:
-        import re as _re
-
-        slug = _re.sub(r"[^0-9a-zA-Z]+", "_", name).strip("_").lower()
-        slug = _re.sub(r"_+", "_", slug)
+        slug = re.sub(r"[^0-9a-zA-Z]+", "_", name).strip("_").lower()
+        slug = re.sub(r"_+", "_", slug)
         return slug or "col"
 
     mapping: Dict[str, str] = {}
@@ -3,8 +3,10 @@ from __future__ import annotations
 
 import ast
 import re
+from itertools import islice
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from app.data.schemas import ChatResponse
@@ -116,7 +118,7 @@ Gere:
                 answer_text = _format_answer_with_result(response, result_df)
                 return ChatResponse(
                     answer_text=answer_text,
-                    dataframe=result_df.head(20).to_dict("records"),  # Limitar a 20 linhas
+                    dataframe=_small_records(result_df.head(20)),  # Limitar a 20 linhas
                 )
         except Exception as e:
             return ChatResponse(
@@ -154,13 +156,14 @@ def _analyze_most_frequent_service(user_query: str, cost_df: pd.DataFrame) -> Ch
     # Filtrar por período se mencionado
     filtered_df = _filter_by_period(user_query, cost_df)
 
-    # Contar quantas vezes cada serviço teve custo > 0
+    # Contar quantas vezes cada serviço teve custo > 0 em uma única passada
+    # NumPy sobre o bloco float64, em vez de uma Series booleana por coluna
     service_cols = _get_service_columns(filtered_df)
-    frequency = {}
-    for col in service_cols:
-        count = (filtered_df[col] > 0).sum()
-        if count > 0:
-            frequency[col] = count
+    if not service_cols:
+        return ChatResponse(answer_text="⚠️ Não foi possível identificar serviços com custos no período especificado.")
+    values = filtered_df[service_cols].to_numpy(dtype=np.float64)
+    counts = (values > 0.0).sum(axis=0)
+    frequency = {col: int(count) for col, count in zip(service_cols, counts) if count > 0}
 
     if not frequency:
         return ChatResponse(answer_text="⚠️ Não foi possível identificar serviços com custos no período especificado.")
@@ -181,33 +184,32 @@ def _analyze_most_frequent_service(user_query: str, cost_df: pd.DataFrame) -> Ch
 
     return ChatResponse(
         answer_text=answer,
-        dataframe=result_df.to_dict("records")
+        dataframe=_small_records(result_df)
     )
 
 
 def _analyze_most_expensive_service(user_query: str, cost_df: pd.DataFrame) -> ChatResponse:
     """Analisa qual serviço teve maior custo total."""
     query_lower = user_query.lower()
-    
-    # Filtrar por período se mencionado
-    filtered_df = cost_df.copy()
-    
-    # Verificar se menciona "últimos meses" ou similar
-    if any(word in query_lower for word in ["ultimos", "últimos", "recentes", "recente"]):
+
+    # Detectar primeiro se a pergunta pede uma janela de "últimos N meses",
+    # para filtrar em uma única passada sem copiar o frame inteiro
+    recent = any(word in query_lower for word in ["ultimos", "últimos", "recentes", "recente"])
+    n_months = 3
+    filtered_df = cost_df
+
+    if recent:
         # Pegar últimos N meses (padrão: 3)
         months_match = re.search(r"(\d+)\s*(meses|mês)", query_lower)
         n_months = int(months_match.group(1)) if months_match else 3
-        
-        if DATE_COLUMN in filtered_df.columns:
+
+        if DATE_COLUMN in cost_df.columns:
             try:
-                filtered_df[DATE_COLUMN] = pd.to_datetime(filtered_df[DATE_COLUMN], errors="coerce")
-                filtered_df = filtered_df.dropna(subset=[DATE_COLUMN])
-                if not filtered_df.empty:
-                    # Ordenar por data e pegar últimos N meses
-                    filtered_df = filtered_df.sort_values(DATE_COLUMN)
-                    last_date = filtered_df[DATE_COLUMN].max()
-                    cutoff_date = last_date - pd.DateOffset(months=n_months)
-                    filtered_df = filtered_df[filtered_df[DATE_COLUMN] >= cutoff_date]
+                dates = pd.to_datetime(cost_df[DATE_COLUMN], errors="coerce")
+                valid = dates.notna()
+                if valid.any():
+                    cutoff_date = dates.max() - pd.DateOffset(months=n_months)
+                    filtered_df = cost_df.loc[valid & (dates >= cutoff_date)]
             except Exception:
                 pass
     else:
@@ -233,17 +235,15 @@ def _analyze_most_expensive_service(user_query: str, cost_df: pd.DataFrame) -> C
         for service, cost in sorted_totals[:10]
     ])
 
-    period_info = ""
-    if any(word in query_lower for word in ["ultimos", "últimos", "recentes"]):
-        period_info = f" nos últimos {n_months} meses"
-    
+    period_info = f" nos últimos {n_months} meses" if recent else ""
+
     answer = f"**Serviço mais consumido{period_info}:** {top_service.replace('($)', '')}\n\n"
     answer += f"Custo total: **${top_cost:,.2f}**\n\n"
     answer += f"**Top 10 serviços por custo total{period_info}:**"
 
     return ChatResponse(
         answer_text=answer,
-        dataframe=result_df.to_dict("records")
+        dataframe=_small_records(result_df)
     )
 
 
@@ -259,7 +259,7 @@ def _analyze_total_cost(user_query: str, cost_df: pd.DataFrame) -> ChatResponse:
 
     return ChatResponse(
         answer_text=answer,
-        dataframe=result_df.to_dict("records")
+        dataframe=_small_records(result_df)
     )
 
 
@@ -274,7 +274,8 @@ def _analyze_period(user_query: str, cost_df: pd.DataFrame) -> ChatResponse:
     total = _sum_total(filtered_df)
 
     service_cols = _get_service_columns(filtered_df)
-    top_services = filtered_df[service_cols].sum().sort_values(ascending=False).head(5)
+    # nlargest faz seleção parcial O(S log k) em vez de ordenar todos os serviços
+    top_services = filtered_df[service_cols].sum().nlargest(5)
 
     answer = f"**Análise do período:**\n\n"
     answer += f"- Total de registros: {len(filtered_df)}\n"
@@ -291,12 +292,21 @@ def _analyze_period(user_query: str, cost_df: pd.DataFrame) -> ChatResponse:
 
     return ChatResponse(
         answer_text=answer,
-        dataframe=result_df.to_dict("records")
+        dataframe=_small_records(result_df)
     )
 
 
 def _get_service_columns(df: pd.DataFrame) -> list[str]:
-    return [col for col in df.columns if col not in [DATE_COLUMN, TOTAL_COLUMN]]
+    # Index.difference é uma operação de conjunto em C — mais barata que a
+    # list comprehension com exclusão linear em frames largos
+    return df.columns.difference([DATE_COLUMN, TOTAL_COLUMN], sort=False).tolist()
+
+
+def _small_records(df: pd.DataFrame) -> list[dict]:
+    """Serializa frames pequenos (≤20 linhas) por coluna, sem o caminho genérico de to_dict."""
+    cols = list(df.columns)
+    arrays = [df[col].tolist() for col in cols]
+    return [dict(zip(cols, row)) for row in zip(*arrays)]
 
 
 def _sum_total(df: pd.DataFrame) -> float:
@@ -314,46 +324,51 @@ def _filter_by_period(user_query: str, cost_df: pd.DataFrame) -> pd.DataFrame:
         return cost_df
 
     query_lower = user_query.lower()
-    filtered_df = cost_df.copy()
 
-    # Converter coluna de data
+    # Converter a coluna de data em uma Series auxiliar, sem copiar o frame
     try:
-        filtered_df[DATE_COLUMN] = pd.to_datetime(filtered_df[DATE_COLUMN], errors="coerce")
+        dates = pd.to_datetime(cost_df[DATE_COLUMN], errors="coerce")
     except Exception:
         return cost_df
 
+    mask = pd.Series(True, index=cost_df.index)
+
     # Filtrar por mês
     for month_name, month_num in MONTH_LOOKUP.items():
         if month_name in query_lower:
-            filtered_df = filtered_df[filtered_df[DATE_COLUMN].dt.month == month_num]
+            mask &= dates.dt.month == month_num
             break
 
     # Filtrar por ano se mencionado
     year_match = re.search(r"\b(20\d{2})\b", user_query)
     if year_match:
         year = int(year_match.group(1))
-        filtered_df = filtered_df[filtered_df[DATE_COLUMN].dt.year == year]
+        mask &= dates.dt.year == year
 
-    return filtered_df
+    return cost_df.loc[mask]
 
 
 def _build_data_context(df: pd.DataFrame) -> str:
     """Constrói contexto sobre os dados para o LLM."""
-    context = f"DataFrame com {len(df)} linhas e {len(df.columns)} colunas.\n\n"
+    # Varre as colunas uma única vez; este contexto roda a cada mensagem do chat
+    columns = df.columns
+    service_cols = _get_service_columns(df)
+
+    context = f"DataFrame com {len(df)} linhas e {len(columns)} colunas.\n\n"
     context += "ESTRUTURA IMPORTANTE:\n"
     context += f"- Coluna de DATA: '{DATE_COLUMN}' (contém as datas dos períodos)\n"
     context += f"- Coluna de TOTAL: '{TOTAL_COLUMN}' (soma de todos os custos)\n"
-    context += f"- Colunas de SERVIÇOS: {len(_get_service_columns(df))} colunas com custos por serviço\n\n"
-    
-    context += f"Todas as colunas: {', '.join(df.columns.tolist()[:10])}"
-    if len(df.columns) > 10:
-        context += f" ... e mais {len(df.columns) - 10} colunas\n"
+    context += f"- Colunas de SERVIÇOS: {len(service_cols)} colunas com custos por serviço\n\n"
+
+    context += f"Todas as colunas: {', '.join(columns[:10])}"
+    if len(columns) > 10:
+        context += f" ... e mais {len(columns) - 10} colunas\n"
     context += "\n"
 
     # Exemplo de dados
     if len(df) > 0:
         context += f"Exemplo de dados (primeiras 2 linhas, apenas algumas colunas):\n"
-        sample_cols = [DATE_COLUMN] + [c for c in df.columns if c != DATE_COLUMN][:5]
+        sample_cols = [DATE_COLUMN, *islice((c for c in columns if c != DATE_COLUMN), 5)]
         context += f"{df[sample_cols].head(2).to_string()}\n"
 
     return context
@@ -92,14 +92,22 @@ def calculate_monthly_totals(cost_df: pd.DataFrame) -> pd.DataFrame:
         numeric_cols = cost_df.select_dtypes(include=["number"]).columns
         if len(numeric_cols) == 0:
             return pd.DataFrame()
-        # Filtrar linhas com pelo menos um valor numérico positivo
-        cost_df["_temp_sum"] = cost_df[numeric_cols].sum(axis=1)
-        cost_df = cost_df[cost_df["_temp_sum"] > 0]
-        if cost_df.empty:
+        # Filtrar linhas com pelo menos um valor numérico positivo.
+        # Uma única redução NumPy sobre o bloco numérico evita a coluna
+        # temporária e o dispatch por coluna do Pandas em tabelas largas.
+        values = cost_df[numeric_cols].to_numpy(dtype=np.float64)
+        row_sums = np.nansum(values, axis=1)
+        positive_mask = row_sums > 0.0
+        if not positive_mask.any():
             return pd.DataFrame()
-        monthly = cost_df.groupby(cost_df[DATE_COLUMN].dt.to_period("M"))["_temp_sum"].sum().reset_index()
+        cost_df = cost_df.loc[positive_mask]
+        sums = pd.Series(row_sums[positive_mask], index=cost_df.index)
+        # Truncar para o mês direto no buffer datetime64 evita construir um
+        # PeriodIndex (que materializa objetos Period por valor).
+        month_keys = cost_df[DATE_COLUMN].to_numpy().astype("datetime64[M]")
+        monthly = sums.groupby(month_keys).sum().reset_index()
         monthly.columns = ["date", "cost"]
-        monthly["date"] = pd.to_datetime(monthly["date"].astype(str))
+        monthly["date"] = pd.to_datetime(monthly["date"])
     monthly = monthly.sort_values("date")
 
     # Garantir que custos sejam floats
@@ -212,16 +220,19 @@ def forecast_costs(cost_df: pd.DataFrame, horizon_months: int = 6) -> List[Forec
     if forecast_df is None or stats is None:
         return []
 
-    results = []
-    for _, row in forecast_df.iterrows():
-        results.append(
-            ForecastResult(
-                date=row["month"].date(),
-                service=None,
-                cost_forecast=row["forecast"],
-                lower_bound=row["lower"],
-                upper_bound=row["upper"],
-            )
+    # Evitar iterrows(): ler os buffers NumPy diretamente é mais barato por linha
+    months = forecast_df["month"].dt.date.to_numpy()
+    forecasts = forecast_df["forecast"].to_numpy()
+    lowers = forecast_df["lower"].to_numpy()
+    uppers = forecast_df["upper"].to_numpy()
+
+    return [
+        ForecastResult(
+            date=month,
+            service=None,
+            cost_forecast=float(forecast),
+            lower_bound=float(lower),
+            upper_bound=float(upper),
         )
-
-    return results
+        for month, forecast, lower, upper in zip(months, forecasts, lowers, uppers)
+    ]
@@ -5,9 +5,10 @@ from typing import Dict, Optional
 
 import pandas as pd
 
+from app.data.repositories import get_monthly_totals, get_service_totals
 from app.infra.cache import cached
 from app.infra.llm_client import LLMClient
-from app.services.analytics_service import get_kpi_summary, get_percentual_distribution_by_service
+from app.models.cost_model import build_highlights, build_service_percentages, calculate_overall_metrics
 
 
 @cached
@@ -25,30 +26,39 @@ def generate_insights(cost_df: pd.DataFrame, kpi_summary: Optional[Dict] = None)
     if cost_df.empty:
         return "⚠️ Sem dados disponíveis para gerar insights."
 
+    # Agregar uma única vez: os totais por serviço e por mês alimentam
+    # KPIs, distribuição percentual e variação mensal sem re-escanear o frame
+    service_totals = get_service_totals(cost_df)
+    monthly_totals = get_monthly_totals(cost_df)
+
     # Calcular KPIs se não fornecidos
     if kpi_summary is None:
-        kpi = get_kpi_summary(cost_df)
-        kpi_summary = kpi.dict()
+        metrics = calculate_overall_metrics(cost_df)
+        highlights = build_highlights(service_totals, monthly_totals)
+        kpi_summary = {
+            "total_cost": metrics.get("total", 0.0),
+            "average_cost": metrics.get("average", 0.0),
+            "max_cost": metrics.get("max", 0.0),
+            "min_cost": metrics.get("min", 0.0),
+            "peak_month": highlights.get("maior_mes"),
+            "lowest_month": highlights.get("menor_mes"),
+            "peak_service": highlights.get("maior_servico"),
+            "lowest_service": highlights.get("menor_servico"),
+        }
 
     # Calcular distribuição percentual
-    distribution = get_percentual_distribution_by_service(cost_df)
+    distribution = build_service_percentages(service_totals)
     top_services = distribution.head(5) if not distribution.empty else pd.DataFrame()
 
-    # Calcular variação mensal se houver coluna de data
+    # Calcular variação mensal a partir dos totais já agregados
     monthly_variation = ""
-    from app.models.cost_model import DATE_COLUMN
-
-    if DATE_COLUMN in cost_df.columns:
-        try:
-            monthly = cost_df.groupby(cost_df[DATE_COLUMN].dt.to_period("M")).sum()
-            if len(monthly) > 1:
-                last_month = monthly.iloc[-1].sum()
-                prev_month = monthly.iloc[-2].sum()
-                if prev_month > 0:
-                    variation = ((last_month - prev_month) / prev_month) * 100
-                    monthly_variation = f"Variação mês a mês: {variation:+.1f}%"
-        except Exception:
-            pass
+    total_column = next((col for col in monthly_totals.columns if col != "Competência"), None)
+    if total_column is not None and len(monthly_totals) > 1:
+        last_month = float(monthly_totals[total_column].iloc[-1])
+        prev_month = float(monthly_totals[total_column].iloc[-2])
+        if prev_month > 0:
+            variation = ((last_month - prev_month) / prev_month) * 100
+            monthly_variation = f"Variação mês a mês: {variation:+.1f}%"
 
     # Montar contexto para o LLM
     context = f"""
@@ -4,37 +4,53 @@ from __future__ import annotations
 from datetime import date
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 CLOUD_ORDER = ["AWS", "OCI", "AZURE"]
 
+_EMPTY_KPIS = {
+    "total_cost": 0.0,
+    "avg_daily": 0.0,
+    "max_month": "-",
+    "min_month": "-",
+    "mom_delta_pct": 0.0,
+    "forecast_next_month": 0.0,
+}
+
 
 def get_kpis(
     df_norm: pd.DataFrame,
     period_filter: Optional[Tuple[date, date]] = None,
     period_days: Optional[int] = None,
+    matrix: Optional[pd.DataFrame] = None,
 ) -> dict:
-    """Calcula KPIs principais do período."""
-
-    df = _apply_period_filter(df_norm, period_filter)
-    if df.empty:
-        return {
-            "total_cost": 0.0,
-            "avg_daily": 0.0,
-            "max_month": "-",
-            "min_month": "-",
-            "mom_delta_pct": 0.0,
-            "forecast_next_month": 0.0,
-        }
-
-    df["usage_date"] = pd.to_datetime(df["usage_date"], errors="coerce")
-    total_cost = float(df["cost_amount"].sum())
+    """Calcula KPIs principais do período.
+
+    Quando a matriz mês × cloud (de build_monthly_cloud_matrix, derivada do
+    frame já recortado pelo período) é fornecida, total, meses extremos e
+    variação M/M saem de somas por eixo O(meses × clouds), sem novo scan
+    das linhas brutas.
+    """
+
+    if matrix is not None:
+        if matrix.empty:
+            return dict(_EMPTY_KPIS)
+        total_cost = float(matrix.to_numpy().sum())
+        monthly_totals = matrix.sum(axis=1)
+        usage_dates = df_norm["usage_date"]
+    else:
+        df = _apply_period_filter(df_norm, period_filter)
+        if df.empty:
+            return dict(_EMPTY_KPIS)
+        total_cost = float(df["cost_amount"].sum())
+        monthly_totals = _monthly_totals(df)
+        usage_dates = df["usage_date"]
 
     if period_days is None:
-        period_days = _days_from_filter(period_filter, df["usage_date"])
+        period_days = _days_from_filter(period_filter, usage_dates)
     avg_daily = float(total_cost / period_days) if period_days else float(total_cost)
 
-    monthly_totals = _monthly_totals(df)
     max_month = monthly_totals.idxmax() if not monthly_totals.empty else "-"
     min_month = monthly_totals.idxmin() if not monthly_totals.empty else "-"
 
@@ -60,104 +76,156 @@ def get_kpis(
     }
 
 
-def get_monthly_trend(df_norm: pd.DataFrame) -> pd.DataFrame:
+def get_monthly_trend(
+    df_norm: pd.DataFrame,
+    base: Optional[pd.Series] = None,
+    matrix: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
     """Retorna dataframe com linhas por provedor e total."""
 
     if df_norm.empty:
         return pd.DataFrame(columns=["month"] + CLOUD_ORDER + ["total"])
 
-    df = _prepare_monthly_frame(df_norm)
-    trend = df.pivot_table(index="month", columns="cloud_provider", values="cost_amount", aggfunc="sum", fill_value=0)
-    for cloud in CLOUD_ORDER:
-        if cloud not in trend.columns:
-            trend[cloud] = 0.0
-    trend = trend[CLOUD_ORDER]
+    if matrix is None:
+        if base is None:
+            base = build_base_cube(df_norm)
+        matrix = build_monthly_cloud_matrix(base)
+    # Cópia antes do total: a matriz pode estar compartilhada com share/KPIs
+    trend = matrix.copy()
     trend["total"] = trend.sum(axis=1)
-    ordering = (
-        df[["month", "month_sort"]]
-        .drop_duplicates()
-        .sort_values("month_sort")
-    )
-    trend = trend.reset_index().merge(ordering, on="month", how="left")
-    return trend.sort_values("month_sort").drop(columns=["month_sort"])
+    return trend.reset_index()
 
 
-def get_top_services(df_norm: pd.DataFrame, n: int = 10) -> pd.DataFrame:
-    """Top serviços por custo."""
+def build_base_cube(df_norm: pd.DataFrame) -> pd.Series:
+    """Agregação base (mês, cloud, categoria, serviço) da qual as demais visões derivam.
+
+    Um único groupby sobre as linhas brutas; tendência, stacked, matriz,
+    share, treemap e insights reagrupam este cubo já reduzido em vez de
+    rescannear o frame inteiro por função.
+    """
 
     if df_norm.empty:
-        return pd.DataFrame(columns=["cloud_provider", "service_name", "cost_amount"])
-    grouped = (
-        df_norm.groupby(["cloud_provider", "service_name"])["cost_amount"].sum().reset_index().sort_values("cost_amount", ascending=False)
+        return pd.Series(dtype=float, name="cost_amount")
+    df = _prepare_monthly_frame(df_norm)
+    return (
+        df.groupby(["month", "cloud_provider", "service_category", "service_name"], observed=True, sort=False)[
+            "cost_amount"
+        ].sum()
     )
-    return grouped.head(n)
 
 
-def get_treemap_data(df_norm: pd.DataFrame, top_k: int = 30) -> pd.DataFrame:
+def build_monthly_cloud_matrix(base: pd.Series) -> pd.DataFrame:
+    """Matriz mês × cloud (meses em ordem cronológica) derivada do cubo.
+
+    Tendência, participação por cloud e KPIs saem desta única redução por
+    somas de eixo, em vez de três reagrupamentos independentes do cubo.
+    """
+
+    if base.empty:
+        return pd.DataFrame(np.zeros((0, len(CLOUD_ORDER))), columns=pd.Index(CLOUD_ORDER), index=pd.Index([], name="month"))
+    matrix = base.groupby(level=["month", "cloud_provider"], observed=True).sum().unstack(fill_value=0)
+    # groupby + unstack usa o sum em Cython direto, sem o caminho genérico
+    # (margens/dropna) do pivot_table; buffer Fortran favorece as somas de eixo
+    matrix = _as_fortran(matrix.reindex(columns=CLOUD_ORDER, fill_value=0.0))
+    return matrix.iloc[_month_order(matrix.index)]
+
+
+def get_top_services(df_norm: pd.DataFrame, n: int = 10, base: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Top serviços por custo."""
+
+    if df_norm.empty:
+        return pd.DataFrame(columns=["cloud_provider", "service_name", "cost_amount"])
+    if base is None:
+        base = build_base_cube(df_norm)
+    # Reagrupar o cubo base agregado é ordens de grandeza mais barato do
+    # que rehashear o frame bruto inteiro
+    grouped = base.groupby(level=["cloud_provider", "service_name"], observed=True).sum()
+    if n == 1:
+        # Só o campeão: argmax linear dispensa a ordenação completa
+        (cloud, service), value = _top1(grouped)
+        return pd.DataFrame([{"cloud_provider": cloud, "service_name": service, "cost_amount": value}])
+    return grouped.reset_index().sort_values("cost_amount", ascending=False).head(n)
+
+
+def get_treemap_data(df_norm: pd.DataFrame, top_k: int = 30, base: Optional[pd.Series] = None) -> pd.DataFrame:
     """Dados hierárquicos (cloud -> categoria -> serviço) para treemap."""
 
     if df_norm.empty:
         return pd.DataFrame(columns=["cloud_provider", "service_category", "service_name", "cost_amount"])
 
+    if base is None:
+        base = build_base_cube(df_norm)
     service_totals = (
-        df_norm.groupby(["cloud_provider", "service_category", "service_name"])["cost_amount"].sum().reset_index()
+        base.groupby(level=["cloud_provider", "service_category", "service_name"], observed=True, sort=False)
+        .sum()
+        .reset_index()
+    )
+    # nlargest faz seleção parcial em vez de ordenar todos os serviços, e o
+    # np.where reatribui o rótulo "Outros" em uma passada; o regroup final
+    # roda sobre o frame já agregado, não sobre as linhas brutas
+    top_services = service_totals.nlargest(top_k, "cost_amount")["service_name"]
+    names = service_totals["service_name"]
+    service_totals["service_name"] = np.where(names.isin(set(top_services)), names, "Outros")
+    return (
+        service_totals.groupby(["cloud_provider", "service_category", "service_name"], observed=True, sort=False)[
+            "cost_amount"
+        ]
+        .sum()
+        .reset_index()
     )
-    top_services = service_totals.sort_values("cost_amount", ascending=False).head(top_k)["service_name"]
-    treemap_df = service_totals.copy()
-    treemap_df.loc[~treemap_df["service_name"].isin(top_services), "service_name"] = "Outros"
-    treemap_df = treemap_df.groupby(["cloud_provider", "service_category", "service_name"])["cost_amount"].sum().reset_index()
-    return treemap_df
 
 
-def get_monthly_stacked(df_norm: pd.DataFrame, stack_by: str = "cloud") -> pd.DataFrame:
+def get_monthly_stacked(df_norm: pd.DataFrame, stack_by: str = "cloud", base: Optional[pd.Series] = None) -> pd.DataFrame:
     """Retorna dados empilhados por mês."""
 
     if df_norm.empty:
         return pd.DataFrame(columns=["month"])
 
-    df = _prepare_monthly_frame(df_norm)
-    if stack_by == "category":
-        pivot = df.pivot_table(index="month", columns="service_category", values="cost_amount", aggfunc="sum", fill_value=0)
-    else:
-        pivot = df.pivot_table(index="month", columns="cloud_provider", values="cost_amount", aggfunc="sum", fill_value=0)
-
-    ordering = (
-        df[["month", "month_sort"]]
-        .drop_duplicates()
-        .sort_values("month_sort")
-    )
-    pivot = pivot.reset_index().merge(ordering, on="month", how="left")
-    return pivot.sort_values("month_sort").drop(columns=["month_sort"])
+    if base is None:
+        base = build_base_cube(df_norm)
+    stack_column = "service_category" if stack_by == "category" else "cloud_provider"
+    pivot = _as_fortran(base.groupby(level=["month", stack_column], observed=True).sum().unstack(fill_value=0))
+    return pivot.iloc[_month_order(pivot.index)].reset_index()
 
 
-def get_cloud_share(df_norm: pd.DataFrame) -> pd.DataFrame:
+def get_cloud_share(
+    df_norm: pd.DataFrame,
+    base: Optional[pd.Series] = None,
+    matrix: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
     """Participação percentual por provedor."""
 
-    totals = df_norm.groupby("cloud_provider")["cost_amount"].sum() if not df_norm.empty else pd.Series(dtype=float)
-    records = []
-    grand_total = totals.sum()
-    for cloud in CLOUD_ORDER:
-        cost_value = float(totals.get(cloud, 0.0))
-        pct = float((cost_value / grand_total * 100) if grand_total else 0.0)
-        records.append({"cloud_provider": cloud, "cost_amount": round(cost_value, 2), "pct": round(pct, 2)})
-    return pd.DataFrame(records)
+    if matrix is None:
+        if base is None:
+            base = build_base_cube(df_norm)
+        matrix = build_monthly_cloud_matrix(base)
+    # Soma de eixo sobre a matriz já reduzida + aritmética vetorizada no
+    # array, sem lookups por label nem montagem de registros em loop Python
+    values = matrix.to_numpy(dtype=float).sum(axis=0) if len(matrix) else np.zeros(len(CLOUD_ORDER))
+    grand_total = values.sum()
+    pct = values / grand_total * 100 if grand_total else np.zeros_like(values)
+    return pd.DataFrame(
+        {
+            "cloud_provider": list(CLOUD_ORDER),
+            "cost_amount": values.round(2),
+            "pct": pct.round(2),
+        }
+    )
 
 
-def get_category_cloud_matrix(df_norm: pd.DataFrame) -> pd.DataFrame:
+def get_category_cloud_matrix(df_norm: pd.DataFrame, base: Optional[pd.Series] = None) -> pd.DataFrame:
     """Tabela categoria x cloud."""
 
     if df_norm.empty:
         return pd.DataFrame(columns=["service_category"] + CLOUD_ORDER)
-    pivot = df_norm.pivot_table(
-        index="service_category",
-        columns="cloud_provider",
-        values="cost_amount",
-        aggfunc="sum",
-        fill_value=0,
+    if base is None:
+        base = build_base_cube(df_norm)
+    pivot = (
+        base.groupby(level=["service_category", "cloud_provider"], observed=True)
+        .sum()
+        .unstack(fill_value=0)
     )
-    for cloud in CLOUD_ORDER:
-        if cloud not in pivot.columns:
-            pivot[cloud] = 0.0
+    pivot = _as_fortran(pivot.reindex(columns=CLOUD_ORDER, fill_value=0.0))
     return pivot.reset_index()
 
 
@@ -167,53 +235,82 @@ def detect_anomalies(df_norm: pd.DataFrame, threshold: float = 100.0, pct_change
     if df_norm.empty:
         return pd.DataFrame(columns=["month", "cloud_provider", "service_name", "cost_amount", "variation_pct"])
 
+    # Com um único mês nenhum grupo tem custo anterior: a saída é
+    # comprovadamente vazia, então nem vale montar o pipeline de
+    # groupby + sort (nunique sobre datetime64 é barato)
+    if (
+        pd.api.types.is_datetime64_any_dtype(df_norm["usage_date"])
+        and df_norm["usage_date"].dt.to_period("M").nunique() < 2
+    ):
+        return pd.DataFrame(columns=["month", "cloud_provider", "service_name", "cost_amount", "variation_pct"])
+
     df = _prepare_monthly_frame(df_norm)
     grouped = (
-        df.groupby(["cloud_provider", "service_name", "month", "month_sort"])["cost_amount"]
+        df.groupby(["cloud_provider", "service_name", "month", "month_sort"], observed=True)["cost_amount"]
         .sum()
         .reset_index()
         .sort_values(["cloud_provider", "service_name", "month_sort"])
     )
 
-    grouped["prev_cost"] = grouped.groupby(["cloud_provider", "service_name"])["cost_amount"].shift(1)
-    grouped["variation_pct"] = ((grouped["cost_amount"] - grouped["prev_cost"]) / grouped["prev_cost"]) * 100
-    anomalies = grouped[
-        (grouped["prev_cost"] > 0)
-        & (grouped["cost_amount"] >= threshold)
-        & (grouped["variation_pct"].abs() >= pct_change)
-    ].copy()
+    if grouped.empty:
+        return pd.DataFrame(columns=["month", "cloud_provider", "service_name", "cost_amount", "variation_pct"])
+
+    # Com o frame já ordenado por (cloud, serviço, mês), o shift por grupo
+    # vira um deslocamento de array com reset nas fronteiras de grupo —
+    # uma passada NumPy em vez de um segundo groupby; a variação usa
+    # np.divide com where= para zerar divisões inválidas sem warnings
+    cloud_codes, _ = pd.factorize(grouped["cloud_provider"], use_na_sentinel=False)
+    service_codes, _ = pd.factorize(grouped["service_name"], use_na_sentinel=False)
+    group_codes = cloud_codes.astype(np.int64) * (int(service_codes.max()) + 1) + service_codes
+
+    cost = grouped["cost_amount"].to_numpy(dtype=np.float64)
+    prev = np.empty_like(cost)
+    prev[0] = 0.0
+    prev[1:] = cost[:-1]
+    prev[np.flatnonzero(group_codes[1:] != group_codes[:-1]) + 1] = 0.0
+    grouped["prev_cost"] = prev
+    variation = np.divide(cost - prev, prev, out=np.zeros_like(cost), where=prev > 0) * 100
+    grouped["variation_pct"] = variation
+    mask = (prev > 0) & (cost >= threshold) & (np.abs(variation) >= pct_change)
+    anomalies = grouped.loc[mask].copy()
     anomalies["month"] = anomalies["month"].astype(str)
     return anomalies[["month", "cloud_provider", "service_name", "cost_amount", "variation_pct"]]
 
 
-def get_treemap_summary(df_norm: pd.DataFrame) -> pd.DataFrame:
+def get_treemap_summary(df_norm: pd.DataFrame, base: Optional[pd.Series] = None) -> pd.DataFrame:
     """Resumo auxiliar com totais por categoria."""
 
     if df_norm.empty:
         return pd.DataFrame(columns=["service_category", "cost_amount"])
-    return df_norm.groupby("service_category")["cost_amount"].sum().reset_index()
+    if base is None:
+        base = build_base_cube(df_norm)
+    return base.groupby(level="service_category", observed=True).sum().reset_index()
 
 
-def generate_insights(df_norm: pd.DataFrame, anomalies_df: pd.DataFrame) -> list[str]:
+def generate_insights(df_norm: pd.DataFrame, anomalies_df: pd.DataFrame, base: Optional[pd.Series] = None) -> list[str]:
     """Gera insights textuais simples."""
 
     insights: list[str] = []
     if df_norm.empty:
         return ["Nenhum dado disponível. Importe arquivos AWS/OCI para iniciar a análise."]
 
-    totals = df_norm.groupby("cloud_provider")["cost_amount"].sum().sort_values(ascending=False)
+    if base is None:
+        base = build_base_cube(df_norm)
+
+    totals = base.groupby(level="cloud_provider", observed=True).sum()
     grand_total = totals.sum()
     if not totals.empty and grand_total > 0:
-        top_cloud = totals.idxmax()
-        pct = totals.iloc[0] / grand_total * 100
+        top_cloud, top_value = _top1(totals)
+        pct = top_value / grand_total * 100
         insights.append(f"{top_cloud} responde por {pct:.1f}% do custo total no período analisado.")
 
-    category_totals = df_norm.groupby("service_category")["cost_amount"].sum().sort_values(ascending=False)
+    category_totals = base.groupby(level="service_category", observed=True).sum()
     if not category_totals.empty:
-        cat, value = category_totals.index[0], category_totals.iloc[0]
+        cat, value = _top1(category_totals)
         insights.append(f"A categoria {cat.title()} consumiu USD {value:,.0f}, liderando a composição.")
 
-    monthly = _monthly_totals(df_norm)
+    monthly = base.groupby(level="month", observed=True).sum()
+    monthly = monthly.iloc[_month_order(monthly.index)]
     if len(monthly) >= 2:
         trend = monthly.tail(2)
         delta = trend.iloc[-1] - trend.iloc[-2]
@@ -221,13 +318,15 @@ def generate_insights(df_norm: pd.DataFrame, anomalies_df: pd.DataFrame) -> list
         insights.append(f"O custo total {direction} USD {abs(delta):,.0f} em relação ao mês anterior.")
 
     if not anomalies_df.empty:
-        anomaly = anomalies_df.sort_values("variation_pct", key=lambda s: s.abs(), ascending=False).iloc[0]
+        # argmax sobre o array de módulos acha a linha extrema em O(N),
+        # sem ordenar o frame inteiro com callback Python
+        anomaly = anomalies_df.iloc[anomalies_df["variation_pct"].abs().to_numpy().argmax()]
         insights.append(
             f"Anomalia: {anomaly['service_name']} em {anomaly['cloud_provider']} variou {anomaly['variation_pct']:.1f}% "
             f"no mês {anomaly['month']}."
         )
 
-    top_services = get_top_services(df_norm, n=1)
+    top_services = get_top_services(df_norm, n=1, base=base)
     if not top_services.empty:
         top_service = top_services.iloc[0]
         insights.append(
@@ -242,6 +341,18 @@ def generate_insights(df_norm: pd.DataFrame, anomalies_df: pd.DataFrame) -> list
 # Auxiliares -----------------------------------------------------------------
 
 
+def _top1(values: pd.Series) -> Tuple:
+    # Rótulo e valor do maior elemento em uma passada linear, sem ordenar
+    pos = int(values.to_numpy().argmax())
+    return values.index[pos], float(values.iloc[pos])
+
+
+def _as_fortran(frame: pd.DataFrame) -> pd.DataFrame:
+    # Buffer column-major: reduções por coluna (e o sum(axis=1) do total)
+    # passam a percorrer memória contígua em vez de pular entre linhas
+    return pd.DataFrame(np.asfortranarray(frame.to_numpy()), index=frame.index, columns=frame.columns)
+
+
 def _days_from_filter(
     period_filter: Optional[Tuple[date, date]],
     usage_dates: pd.Series,
@@ -251,7 +362,10 @@ def _days_from_filter(
         if span > 0:
             return span
 
-    normalized = pd.to_datetime(usage_dates, errors="coerce").dropna()
+    normalized = usage_dates
+    if not pd.api.types.is_datetime64_any_dtype(normalized):
+        normalized = pd.to_datetime(normalized, errors="coerce")
+    normalized = normalized.dropna()
     if normalized.empty:
         return None
 
@@ -261,37 +375,53 @@ def _days_from_filter(
 
 def _apply_period_filter(df_norm: pd.DataFrame, period_filter: Optional[Tuple[date, date]]) -> pd.DataFrame:
     if df_norm.empty or not period_filter:
-        return df_norm.copy()
+        return df_norm
     start, end = period_filter
-    df = df_norm.copy()
-    df["usage_date"] = pd.to_datetime(df["usage_date"], errors="coerce")
+    # Parse das datas em uma Series auxiliar e filtro por máscara única:
+    # nenhuma cópia completa do frame, só a fatia final selecionada
+    usage_dates = df_norm["usage_date"]
+    if not pd.api.types.is_datetime64_any_dtype(usage_dates):
+        usage_dates = pd.to_datetime(usage_dates, errors="coerce")
+        df_norm = df_norm.assign(usage_date=usage_dates)
+    mask = pd.Series(True, index=df_norm.index)
     if start:
-        df = df[df["usage_date"] >= pd.to_datetime(start)]
+        mask &= usage_dates >= pd.to_datetime(start)
     if end:
-        df = df[df["usage_date"] <= pd.to_datetime(end)]
-    return df
+        mask &= usage_dates <= pd.to_datetime(end)
+    return df_norm.loc[mask]
 
 
 def _prepare_monthly_frame(df_norm: pd.DataFrame) -> pd.DataFrame:
-    df = df_norm.copy()
-    df["usage_date"] = pd.to_datetime(df["usage_date"], errors="coerce")
-    month_labels = df["usage_date"].dt.to_period("M").astype(str)
+    # Frames vindos de normalize_costs já trazem month/month_sort prontos;
+    # reaproveitá-los evita repetir o parse de datas e a materialização de
+    # strings de período a cada função de analytics no mesmo render
+    if (
+        "month" in df_norm.columns
+        and "month_sort" in df_norm.columns
+        and pd.api.types.is_datetime64_any_dtype(df_norm["usage_date"])
+    ):
+        return df_norm
+    # assign copia apenas os blocos das colunas derivadas, sem o deep copy
+    # integral que df.copy() faria
+    usage_dates = df_norm["usage_date"]
+    if not pd.api.types.is_datetime64_any_dtype(usage_dates):
+        usage_dates = pd.to_datetime(usage_dates, errors="coerce")
+    month_labels = usage_dates.dt.to_period("M").astype(str)
     na_mask = month_labels.isna() | (month_labels == "NaT")
-    if "month" in df.columns:
-        month_labels.loc[na_mask] = df.loc[na_mask, "month"].fillna("Sem data").astype(str)
+    if "month" in df_norm.columns:
+        month_labels = month_labels.mask(na_mask, df_norm["month"].fillna("Sem data").astype(str))
     month_sort = pd.to_datetime(month_labels, errors="coerce")
-    df["month"] = month_labels
-    df["month_sort"] = month_sort
-    return df
+    return df_norm.assign(usage_date=usage_dates, month=month_labels, month_sort=month_sort)
+
+
+def _month_order(month_index: pd.Index) -> np.ndarray:
+    # Ordenação cronológica direta sobre o índice agregado (um valor por mês):
+    # dispensa o hash-join de drop_duplicates + merge com month_sort.
+    # NaT ("Sem data") cai no final, como na ordenação anterior.
+    return pd.to_datetime(month_index, errors="coerce").argsort()
 
 
 def _monthly_totals(df_norm: pd.DataFrame) -> pd.Series:
     df = _prepare_monthly_frame(df_norm)
-    totals = (
-        df.groupby("month")["cost_amount"]
-        .sum()
-        .reset_index()
-        .merge(df[["month", "month_sort"]].drop_duplicates(), on="month", how="left")
-        .sort_values("month_sort")
-    )
-    return totals.set_index("month")["cost_amount"]
+    totals = df.groupby("month", observed=True)["cost_amount"].sum()
+    return totals.iloc[_month_order(totals.index)]
@@ -1,17 +1,33 @@
 """Serviço de geração de recomendações de otimização FinOps."""
 from __future__ import annotations
 
-from typing import Dict, List
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
 import pandas as pd
 
 from app.data.schemas import Recommendation
 from app.data.repositories import get_percentual_distribution, get_service_totals
-from app.infra.cache import cached
 from app.infra.llm_client import LLMClient
 
+# Cliente único por processo: evita reconstruir o LLMClient a cada descrição
+_LLM = LLMClient()
+
+_LLM_FOCUS = {
+    "rds": ("RDS", "Mencione Reserved Instances, Savings Plans e right-sizing."),
+    "s3": ("S3", "Mencione lifecycle policies, S3-IA e Glacier."),
+    "ec2": ("EC2", "Mencione Reserved Instances, Savings Plans, Spot Instances e right-sizing."),
+}
+
+_LLM_FALLBACKS = {
+    "rds": "RDS representa {pct:.1f}% dos custos. Considere Reserved Instances para economizar até 40%.",
+    "s3": "S3 representa {pct:.1f}% dos custos. Configure lifecycle policies para mover dados antigos para S3-IA ou Glacier.",
+    "ec2": "EC2 representa {pct:.1f}% dos custos. Considere Reserved Instances ou Savings Plans para economizar.",
+}
+
 
-@cached
 def generate_recommendations(aggregated_data: Dict | pd.DataFrame) -> List[Recommendation]:
     """
     Gera recomendações de otimização FinOps.
@@ -22,8 +38,6 @@ def generate_recommendations(aggregated_data: Dict | pd.DataFrame) -> List[Recom
     Returns:
         Lista de Recommendation
     """
-    recommendations = []
-
     # Se recebeu DataFrame, calcular agregações
     if isinstance(aggregated_data, pd.DataFrame):
         if aggregated_data.empty:
@@ -40,77 +54,108 @@ def generate_recommendations(aggregated_data: Dict | pd.DataFrame) -> List[Recom
     if service_totals.empty:
         return []
 
-    # Regra 1: RDS domina custos
-    rds_services = [s for s in service_totals.index if "RDS" in str(s) or "Relational Database" in str(s)]
-    if rds_services:
-        rds_total = sum(service_totals[s] for s in rds_services if s in service_totals.index)
-        rds_percent = (rds_total / total_cost * 100) if total_cost > 0 else 0
+    # Assinatura barata e estável dos insumos: o @cached genérico serializava
+    # o frame inteiro via str() a cada chamada, sem garantia de hit
+    signature = (
+        int(len(service_totals)),
+        round(float(total_cost), 2),
+        tuple(sorted(str(s) for s in service_totals.nlargest(3).index)),
+    )
+    _RULE_INPUTS[signature] = (service_totals, distribution, total_cost)
+    try:
+        return _generate_recommendations_cached(signature)
+    finally:
+        _RULE_INPUTS.pop(signature, None)
 
-        if rds_percent > 20:  # Mais de 20% do total
-            recommendations.append(
-                Recommendation(
-                    title="Otimizar RDS com Reserved Instances",
-                    impact="alto",
-                    estimated_saving_percent=20.0,
-                    description=_generate_rds_recommendation(rds_total, rds_percent),
-                    service="RDS",
-                    category="reserved_instances",
-                )
+
+# Insumos da avaliação de regras em curso, indexados pela mesma assinatura do
+# lru_cache abaixo; a entrada é reposta a cada chamada e descartada ao final
+_RULE_INPUTS: Dict[Tuple, Tuple[pd.Series, pd.DataFrame, float]] = {}
+
+
+@lru_cache(maxsize=16)
+def _generate_recommendations_cached(signature: Tuple) -> List[Recommendation]:
+    service_totals, distribution, total_cost = _RULE_INPUTS[signature]
+    recommendations = []
+
+    # Totais por família de serviço (regras 1-4): uma passada vetorizada
+    # pelos nomes via kernels C de string, sem loops Python por regra
+    idx = service_totals.index.astype(str)
+    family_masks = {
+        "rds": idx.str.contains("RDS|Relational Database", regex=True),
+        "s3": idx.str.contains("S3", regex=False) & ~idx.str.contains("Glacier", regex=False),
+        "support": idx.str.contains("Support", regex=False),
+        "ec2": idx.str.contains("EC2", regex=False),
+    }
+    family_totals = {key: float(service_totals[mask].sum()) for key, mask in family_masks.items()}
+    family_percents = {
+        key: (value / total_cost * 100) if total_cost > 0 else 0
+        for key, value in family_totals.items()
+    }
+
+    # Uma única chamada LLM gera todas as descrições das regras disparadas,
+    # em vez de uma round-trip HTTP por recomendação
+    llm_specs = []
+    if family_masks["rds"].any() and family_percents["rds"] > 20:
+        llm_specs.append(("rds", round(family_totals["rds"], 2), round(family_percents["rds"], 1)))
+    if family_masks["s3"].any() and family_percents["s3"] > 15:
+        llm_specs.append(("s3", round(family_totals["s3"], 2), round(family_percents["s3"], 1)))
+    if family_masks["ec2"].any() and family_percents["ec2"] > 25:
+        llm_specs.append(("ec2", round(family_totals["ec2"], 2), round(family_percents["ec2"], 1)))
+    descriptions = _generate_service_descriptions(tuple(llm_specs))
+
+    # Regra 1: RDS domina custos (mais de 20% do total)
+    if "rds" in descriptions:
+        recommendations.append(
+            Recommendation(
+                title="Otimizar RDS com Reserved Instances",
+                impact="alto",
+                estimated_saving_percent=20.0,
+                description=descriptions["rds"],
+                service="RDS",
+                category="reserved_instances",
             )
+        )
 
     # Regra 2: S3-Standard com muitos dados antigos
-    s3_services = [s for s in service_totals.index if "S3" in str(s) and "Glacier" not in str(s)]
-    if s3_services:
-        s3_total = sum(service_totals[s] for s in s3_services if s in service_totals.index)
-        s3_percent = (s3_total / total_cost * 100) if total_cost > 0 else 0
-
-        if s3_percent > 15:
-            recommendations.append(
-                Recommendation(
-                    title="Otimizar armazenamento S3 com lifecycle policies",
-                    impact="medio",
-                    estimated_saving_percent=30.0,
-                    description=_generate_s3_recommendation(s3_total, s3_percent),
-                    service="S3",
-                    category="storage_optimization",
-                )
+    if "s3" in descriptions:
+        recommendations.append(
+            Recommendation(
+                title="Otimizar armazenamento S3 com lifecycle policies",
+                impact="medio",
+                estimated_saving_percent=30.0,
+                description=descriptions["s3"],
+                service="S3",
+                category="storage_optimization",
             )
+        )
 
     # Regra 3: Support Business muito alto
-    support_services = [s for s in service_totals.index if "Support" in str(s)]
-    if support_services:
-        support_total = sum(service_totals[s] for s in support_services if s in service_totals.index)
-        support_percent = (support_total / total_cost * 100) if total_cost > 0 else 0
-
-        if support_percent > 5:
-            recommendations.append(
-                Recommendation(
-                    title="Revisar nível de suporte AWS",
-                    impact="medio",
-                    estimated_saving_percent=50.0,
-                    description=f"O custo de suporte ({support_percent:.1f}% do total) pode ser otimizado revisando o nível necessário.",
-                    service="Support",
-                    category="support_optimization",
-                )
+    support_percent = family_percents["support"]
+    if family_masks["support"].any() and support_percent > 5:
+        recommendations.append(
+            Recommendation(
+                title="Revisar nível de suporte AWS",
+                impact="medio",
+                estimated_saving_percent=50.0,
+                description=f"O custo de suporte ({support_percent:.1f}% do total) pode ser otimizado revisando o nível necessário.",
+                service="Support",
+                category="support_optimization",
             )
+        )
 
     # Regra 4: EC2 sem otimização
-    ec2_services = [s for s in service_totals.index if "EC2" in str(s)]
-    if ec2_services:
-        ec2_total = sum(service_totals[s] for s in ec2_services if s in service_totals.index)
-        ec2_percent = (ec2_total / total_cost * 100) if total_cost > 0 else 0
-
-        if ec2_percent > 25:
-            recommendations.append(
-                Recommendation(
-                    title="Otimizar instâncias EC2",
-                    impact="alto",
-                    estimated_saving_percent=15.0,
-                    description=_generate_ec2_recommendation(ec2_total, ec2_percent),
-                    service="EC2",
-                    category="compute_optimization",
-                )
+    if "ec2" in descriptions:
+        recommendations.append(
+            Recommendation(
+                title="Otimizar instâncias EC2",
+                impact="alto",
+                estimated_saving_percent=15.0,
+                description=descriptions["ec2"],
+                service="EC2",
+                category="compute_optimization",
             )
+        )
 
     # Regra 5: Serviço dominante (>40% do total)
     if not distribution.empty:
@@ -130,35 +175,43 @@ def generate_recommendations(aggregated_data: Dict | pd.DataFrame) -> List[Recom
     return recommendations
 
 
-def _generate_rds_recommendation(rds_total: float, rds_percent: float) -> str:
-    """Gera descrição detalhada para recomendação RDS."""
-    llm_client = LLMClient()
-    prompt = f"""Gere uma recomendação FinOps em português sobre otimização de RDS.
-RDS representa {rds_percent:.1f}% do custo total (${rds_total:,.2f}).
-Mencione Reserved Instances, Savings Plans e right-sizing."""
-    return llm_client.generate(
-        "Você é um consultor FinOps. Seja objetivo e prático.", prompt, temperature=0.5
-    ) or f"RDS representa {rds_percent:.1f}% dos custos. Considere Reserved Instances para economizar até 40%."
-
-
-def _generate_s3_recommendation(s3_total: float, s3_percent: float) -> str:
-    """Gera descrição detalhada para recomendação S3."""
-    llm_client = LLMClient()
-    prompt = f"""Gere uma recomendação FinOps em português sobre otimização de S3.
-S3 representa {s3_percent:.1f}% do custo total (${s3_total:,.2f}).
-Mencione lifecycle policies, S3-IA e Glacier."""
-    return llm_client.generate(
-        "Você é um consultor FinOps. Seja objetivo e prático.", prompt, temperature=0.5
-    ) or f"S3 representa {s3_percent:.1f}% dos custos. Configure lifecycle policies para mover dados antigos para S3-IA ou Glacier."
-
-
-def _generate_ec2_recommendation(ec2_total: float, ec2_percent: float) -> str:
-    """Gera descrição detalhada para recomendação EC2."""
-    llm_client = LLMClient()
-    prompt = f"""Gere uma recomendação FinOps em português sobre otimização de EC2.
-EC2 representa {ec2_percent:.1f}% do custo total (${ec2_total:,.2f}).
-Mencione Reserved Instances, Savings Plans, Spot Instances e right-sizing."""
-    return llm_client.generate(
-        "Você é um consultor FinOps. Seja objetivo e prático.", prompt, temperature=0.5
-    ) or f"EC2 representa {ec2_percent:.1f}% dos custos. Considere Reserved Instances ou Savings Plans para economizar."
+@lru_cache(maxsize=64)
+def _generate_service_descriptions(specs: Tuple[Tuple[str, float, float], ...]) -> Dict[str, str]:
+    """
+    Gera as descrições detalhadas das regras disparadas em uma única chamada LLM.
+
+    Args:
+        specs: Tuplas (chave, total, percentual) com valores arredondados —
+            a assinatura estável permite memoizar re-renders com KPIs inalterados.
+
+    Returns:
+        Dict chave -> descrição (fallback estático se o LLM falhar)
+    """
+    if not specs:
+        return {}
+
+    fallbacks = {key: _LLM_FALLBACKS[key].format(pct=pct) for key, _, pct in specs}
+
+    lines = []
+    for key, total, pct in specs:
+        name, focus = _LLM_FOCUS[key]
+        lines.append(f'- "{key}": {name} representa {pct:.1f}% do custo total (${total:,.2f}). {focus}')
+
+    keys = ", ".join(f'"{key}"' for key, _, _ in specs)
+    prompt = f"""Gere recomendações FinOps em português sobre otimização dos serviços abaixo.
+Responda APENAS com um objeto JSON cujas chaves são {keys}, cada valor sendo um texto curto de recomendação.
+
+{chr(10).join(lines)}"""
+
+    response = _LLM.generate("Você é um consultor FinOps. Seja objetivo e prático.", prompt, temperature=0.5)
+    json_match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not json_match:
+        return fallbacks
+
+    try:
+        parsed = json.loads(json_match.group(0))
+    except (json.JSONDecodeError, TypeError):
+        return fallbacks
+
+    return {key: str(parsed.get(key) or fallback) for key, fallback in fallbacks.items()}
 
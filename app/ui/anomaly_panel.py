@@ -8,6 +8,21 @@ from app.data.repositories import get_monthly_totals
 from app.services.anomaly_service import detect_anomalies
 
 
+def _frame_digest(df: pd.DataFrame) -> tuple:
+    """Resumo barato e estável do frame para o cache do Streamlit."""
+    return (df.shape, tuple(df.columns), float(df.select_dtypes("number").to_numpy().sum()))
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def _compute_anomalies(cost_df: pd.DataFrame) -> tuple:
+    # Agregação mensal + detecção rodam uma vez por dataset; reruns do
+    # Streamlit com o mesmo frame leem direto do cache
+    monthly_data = get_monthly_totals(cost_df)
+    if monthly_data.empty:
+        return monthly_data, []
+    return monthly_data, detect_anomalies(monthly_data)
+
+
 def render_anomaly_panel(cost_df: pd.DataFrame) -> None:
     """Renderiza painel de anomalias detectadas."""
     st.markdown("### Detecção de Anomalias")
@@ -17,24 +32,26 @@ def render_anomaly_panel(cost_df: pd.DataFrame) -> None:
         st.info("Sem dados para detectar anomalias.")
         return
 
-    monthly_data = get_monthly_totals(cost_df)
+    with st.spinner("Detectando anomalias..."):
+        monthly_data, anomalies = _compute_anomalies(cost_df)
 
     if monthly_data.empty:
         st.warning("Dados insuficientes para detecção de anomalias. É necessário histórico mensal.")
         return
 
-    with st.spinner("Detectando anomalias..."):
-        anomalies = detect_anomalies(monthly_data)
-
     if not anomalies:
         st.success("✅ Nenhuma anomalia detectada nos dados analisados.")
         return
 
     st.warning(f"⚠️ {len(anomalies)} anomalia(s) detectada(s)")
 
-    # Tabela de anomalias
-    anomalies_df = pd.DataFrame([a.dict() for a in anomalies])
-    st.dataframe(anomalies_df[["date", "service", "cost", "anomaly_score", "explanation"]], use_container_width=True)
+    # Tabela de anomalias montada por tuplas: evita um dict pydantic
+    # completo por linha e o construtor lento de lista-de-dicts
+    anomalies_df = pd.DataFrame(
+        [(a.date, a.service, a.cost, a.anomaly_score, a.explanation) for a in anomalies],
+        columns=["date", "service", "cost", "anomaly_score", "explanation"],
+    )
+    st.dataframe(anomalies_df, use_container_width=True)
 
     # Detalhes
     for anomaly in anomalies:
@@ -1,64 +1,186 @@
 """Componentes de gráficos."""
 from __future__ import annotations
 
+from itertools import cycle, islice
 from typing import List, Optional
 
-import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
 from app.models.cost_model import DATE_COLUMN, TOTAL_COLUMN, get_service_columns
 
+# plotly e numpy são importados dentro das funções de figura: sessões que
+# nunca abrem as abas de gráficos não pagam o custo de import no cold start
 
-def render_ranking_chart(table_ranking: pd.DataFrame) -> None:
-    """Renderiza gráfico de ranking de custos (barras horizontais) com tooltips interativos."""
-    if table_ranking.empty:
-        st.info("Sem dados para exibir o ranking.")
-        return
+# A partir deste número de barras o ranking deixa de desenhar o valor ao
+# lado de cada barra (o texto por barra é o que mais pesa no SVG)
+_RANKING_TEXT_THRESHOLD = 100
 
-    ranking_sorted = table_ranking.sort_values("Custo", ascending=False)
-    
-    # Calcular altura baseada no número de serviços
-    height = max(6, len(ranking_sorted) * 0.4) * 100  # Converter para pixels
-    
-    # Criar gráfico de barras horizontais com Plotly para ter tooltips interativos
+# Layouts estáticos construídos uma vez no import; junto com um uirevision
+# estável por tipo de gráfico, o Plotly.js preserva zoom/pan e faz diff em
+# vez de redesenhar tudo a cada rerun
+_RANKING_LAYOUT = dict(
+    xaxis=dict(
+        title="Custo ($)",
+        tickformat="$,.0f",
+        gridcolor="rgba(0,0,0,0.1)",
+        showgrid=True,
+    ),
+    yaxis=dict(
+        title="Serviço",
+        autorange="reversed",  # Inverter para mostrar maior no topo
+    ),
+    margin=dict(l=20, r=20, t=20, b=20),
+    showlegend=False,
+)
+
+_PIE_LAYOUT = dict(showlegend=False, margin=dict(t=0, b=0, l=0, r=0))
+
+_MONTHLY_SINGLE_LAYOUT = dict(
+    height=400,
+    xaxis=dict(title="Mês", tickangle=-45),
+    yaxis=dict(title="Custo ($)", tickformat="$,.0f"),
+    margin=dict(l=20, r=20, t=20, b=80),
+    showlegend=False,
+    barmode="group",
+)
+
+_MONTHLY_STACK_LAYOUT = dict(
+    height=400,
+    xaxis=dict(title="Mês", tickangle=-45),
+    yaxis=dict(title="Custo Total ($)", tickformat="$,.0f"),
+    margin=dict(l=20, r=20, t=20, b=80),
+    legend=dict(
+        orientation="v",
+        yanchor="top",
+        y=1,
+        xanchor="left",
+        x=1.02,
+        font=dict(size=10),
+    ),
+    barmode="stack",
+)
+
+
+def _frame_digest(df: pd.DataFrame) -> tuple:
+    """Resumo barato e estável do frame para o cache do Streamlit."""
+    return (df.shape, tuple(df.columns), float(df.select_dtypes("number").to_numpy().sum()))
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def _prep_monthly(cost_df: pd.DataFrame) -> pd.DataFrame:
+    # O parse de datas domina o custo em CSVs grandes; cacheado, roda uma vez
+    # por dataset em vez de a cada rerun do Streamlit (cache=True memoiza
+    # strings de data repetidas dentro do próprio parse)
+    out = cost_df.copy()
+    out[DATE_COLUMN] = pd.to_datetime(out[DATE_COLUMN], errors="coerce", cache=True)
+    out = out.dropna(subset=[DATE_COLUMN])
+    out["Mês"] = out[DATE_COLUMN].dt.to_period("M")
+    return out
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def compute_monthly_service_totals(cost_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totais mês × serviço agregados uma única vez por dataset.
+
+    O frame largo (PeriodIndex mensal × colunas de serviço) fica no cache do
+    Streamlit e alimenta os gráficos mensais sem repetir o groupby a cada
+    rerun ou por painel.
+    """
+    import numpy as np
+
+    if DATE_COLUMN not in cost_df.columns:
+        return pd.DataFrame()
+
+    service_cols = get_service_columns(cost_df)
+    if not service_cols:
+        return pd.DataFrame()
+
+    df = _prep_monthly(cost_df[[DATE_COLUMN, *service_cols]])
+    if df.empty:
+        return pd.DataFrame()
+
+    # float32 reduz pela metade a banda de memória do scan de agregação;
+    # a precisão é mais que suficiente para somas de custo em USD
+    df[service_cols] = df[service_cols].astype(np.float32, copy=False)
+    return df.groupby("Mês")[service_cols].sum().sort_index()
+
+
+def _hash_frame(df: pd.DataFrame) -> bytes:
+    """Hash exato dos valores — os frames de figura são pequenos, então é barato."""
+    return pd.util.hash_pandas_object(df, index=True).values.tobytes()
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_ranking_fig(ranking_sorted: pd.DataFrame, height: int) -> "go.Figure":
+    import numpy as np
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    # Construção da figura isolada e cacheada: reruns disparados por widgets
+    # alheios ao gráfico reutilizam o go.Figure pronto
     fig = go.Figure()
-    
-    # Gerar cores distintas para cada barra
-    colors = px.colors.qualitative.Set3[:len(ranking_sorted)]
-    
+
+    # Gerar cores distintas para cada barra: cycle repete a paleta quando o
+    # ranking passa de 12 itens (o slice antigo truncava e gerava Nones)
+    colors = list(islice(cycle(px.colors.qualitative.Set3), len(ranking_sorted)))
+
+    # Acima do limiar, o rótulo desenhado por barra domina o custo de SVG
+    # no navegador; rankings muito longos ficam só com o tooltip
+    show_bar_text = len(ranking_sorted) <= _RANKING_TEXT_THRESHOLD
+
+    # Arrays NumPy tipados ativam o caminho binário/base64 do Plotly,
+    # reduzindo o payload JSON serializado para o navegador
     fig.add_trace(
         go.Bar(
-            y=ranking_sorted["Serviço"],
-            x=ranking_sorted["Custo"],
+            y=ranking_sorted["Serviço"].to_numpy(),
+            x=ranking_sorted["Custo"].to_numpy(dtype=np.float32),
             orientation="h",
             marker=dict(color=colors),
             hovertemplate="<b>%{y}</b><br>Custo: $%{x:,.2f}<extra></extra>",
-            text=[f"${x:,.0f}" for x in ranking_sorted["Custo"]],
-            textposition="outside",
+            text=[f"${x:,.0f}" for x in ranking_sorted["Custo"]] if show_bar_text else None,
+            textposition="outside" if show_bar_text else None,
         )
     )
     
-    fig.update_layout(
-        xaxis=dict(
-            title="Custo ($)",
-            tickformat="$,.0f",
-            gridcolor="rgba(0,0,0,0.1)",
-            showgrid=True,
-        ),
-        yaxis=dict(
-            title="Serviço",
-            autorange="reversed",  # Inverter para mostrar maior no topo
-        ),
-        height=height,
-        margin=dict(l=20, r=20, t=20, b=20),
-        showlegend=False,
-    )
-    
+    fig.update_layout(uirevision="finops-ranking", height=height, **_RANKING_LAYOUT)
+
+    return fig
+
+
+def render_ranking_chart(table_ranking: pd.DataFrame) -> None:
+    """Renderiza gráfico de ranking de custos (barras horizontais) com tooltips interativos."""
+    if table_ranking.empty:
+        st.info("Sem dados para exibir o ranking.")
+        return
+
+    ranking_sorted = table_ranking.sort_values("Custo", ascending=False)
+
+    # Calcular altura baseada no número de serviços
+    height = max(6, len(ranking_sorted) * 0.4) * 100  # Converter para pixels
+
+    fig = _build_ranking_fig(ranking_sorted, int(height))
     st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
 
 
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_distribution_fig(pie_data: pd.DataFrame, plot_height: int) -> "go.Figure":
+    import numpy as np
+    import plotly.express as px
+
+    # Mesmo racional do ranking: figura pronta reaproveitada entre reruns
+    # Arrays tipados no lugar de colunas do frame: payload menor no navegador
+    fig = px.pie(
+        values=pie_data["Percentual"].to_numpy(dtype=np.float32),
+        names=pie_data["Serviço"].to_numpy(),
+        hole=0.4,
+        title="",
+    )
+    fig.update_traces(hovertemplate="<b>%{label}</b><br>Percentual: %{percent}<extra></extra>", textinfo="none")
+    fig.update_layout(uirevision="finops-distribution", height=plot_height, **_PIE_LAYOUT)
+    return fig
+
+
 def render_distribution_chart(table_percentual: pd.DataFrame, ranking_count: int = 0) -> None:
     """
     Renderiza gráfico de distribuição percentual (pizza).
@@ -71,11 +193,12 @@ def render_distribution_chart(table_percentual: pd.DataFrame, ranking_count: int
         st.info("Sem dados para exibir a distribuição.")
         return
 
-    percentual_sorted = table_percentual.sort_values("Percentual", ascending=False)
-    top_10 = percentual_sorted.head(10)
+    # nlargest faz seleção parcial O(N) dos 10 maiores, sem ordenar a tabela
+    # inteira; o resto vira "Outros" por diferença de somas
+    top_10 = table_percentual.nlargest(10, "Percentual")
 
-    if len(percentual_sorted) > 10:
-        outros_percentual = percentual_sorted.iloc[10:]["Percentual"].sum()
+    if len(table_percentual) > 10:
+        outros_percentual = float(table_percentual["Percentual"].sum() - top_10["Percentual"].sum())
         outros_row = pd.DataFrame({"Serviço": ["Outros"], "Custo": [0], "Percentual": [outros_percentual]})
         pie_data = pd.concat([top_10, outros_row], ignore_index=True)
     else:
@@ -91,20 +214,23 @@ def render_distribution_chart(table_percentual: pd.DataFrame, ranking_count: int
         # Altura padrão se não soubermos o número de itens
         plot_height = 600  # Equivalente a 6 polegadas
     
-    fig = px.pie(pie_data, values="Percentual", names="Serviço", hole=0.4, title="")
-    fig.update_traces(hovertemplate="<b>%{label}</b><br>Percentual: %{percent}<extra></extra>", textinfo="none")
-    fig.update_layout(showlegend=False, margin=dict(t=0, b=0, l=0, r=0), height=plot_height)
+    fig = _build_distribution_fig(pie_data, plot_height)
     st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
 
 
+@st.cache_data(show_spinner=False)
+def _evolution_series(monthly_totals: pd.DataFrame, chart_column: str) -> pd.DataFrame:
+    # set_index + slice rodam uma vez por (frame, coluna); reruns reutilizam
+    return monthly_totals.set_index("Competência")[[chart_column]]
+
+
 def render_evolution_chart(monthly_totals: pd.DataFrame, chart_column: str) -> None:
     """Renderiza gráfico de evolução mensal."""
     if monthly_totals.empty or chart_column not in monthly_totals.columns:
         st.info("Sem dados para exibir a evolução mensal.")
         return
 
-    evolution_df = monthly_totals.set_index("Competência")[[chart_column]]
-    st.line_chart(evolution_df, height=420)
+    st.line_chart(_evolution_series(monthly_totals, chart_column), height=420)
 
 
 def render_monthly_bar_chart(cost_df: pd.DataFrame, services: Optional[List[str]] = None, chart_column: Optional[str] = None) -> None:
@@ -122,6 +248,8 @@ def render_monthly_bar_chart(cost_df: pd.DataFrame, services: Optional[List[str]
         services: Lista de serviços para incluir (None = todos os serviços disponíveis)
         chart_column: Coluna selecionada para gráficos (pode ser TOTAL_COLUMN ou um serviço específico)
     """
+    import plotly.express as px
+
     if cost_df.empty:
         st.info("Sem dados para exibir o total mensal.")
         return
@@ -131,87 +259,58 @@ def render_monthly_bar_chart(cost_df: pd.DataFrame, services: Optional[List[str]
         st.info("Sem coluna de data para exibir.")
         return
 
-    # Preparar dados: converter data e filtrar
-    df = cost_df.copy()
-    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], errors="coerce")
-    df = df.dropna(subset=[DATE_COLUMN])
-
-    if df.empty:
-        st.info("Sem dados válidos para exibir.")
-        return
-
     # Determinar modo de exibição baseado no filtro
     # Se chart_column for um serviço específico (não TOTAL_COLUMN), mostrar apenas esse serviço
     show_single_service = False
     single_service_col = None
-    
+
     if chart_column and chart_column != TOTAL_COLUMN:
-        if chart_column in df.columns:
+        if chart_column in cost_df.columns:
             show_single_service = True
             single_service_col = chart_column
     elif services and len(services) == 1:
-        if services[0] in df.columns:
+        if services[0] in cost_df.columns:
             show_single_service = True
             single_service_col = services[0]
-    
+
+    # Cubo mês × serviço compartilhado: o groupby roda uma vez por dataset
+    # (st.cache_data) e os dois modos abaixo apenas fatiam colunas dele
+    monthly_all = compute_monthly_service_totals(cost_df)
+
+    if monthly_all.empty:
+        st.info("Sem dados válidos para exibir.")
+        return
+
     # Modo: gráfico empilhado completo
     if not show_single_service:
         # Identificar colunas de serviços disponíveis
-        available_service_cols = [col for col in (services or get_service_columns(df)) if col in df.columns]
-        
+        available_service_cols = [col for col in (services or list(monthly_all.columns)) if col in monthly_all.columns]
+
         if not available_service_cols:
             st.info("Sem colunas de serviços para exibir.")
             return
     else:
         # Modo de serviço único: usar apenas a coluna do serviço selecionado
+        if single_service_col not in monthly_all.columns:
+            st.info("Sem dados para exibir.")
+            return
         available_service_cols = [single_service_col]
 
-    # Agregar por mês
-    df["Mês"] = df[DATE_COLUMN].dt.to_period("M")
-    
     # Modo de serviço único: exibir apenas esse serviço
     if show_single_service:
-        monthly_data = []
-        for month in df["Mês"].unique():
-            month_df = df[df["Mês"] == month]
-            month_str = str(month)
-            
-            total = month_df[single_service_col].sum() if single_service_col in month_df.columns else 0
-            if pd.notna(total):
-                monthly_data.append({
-                    "Mês": month_str,
-                    single_service_col: float(total)
-                })
-        
-        if not monthly_data:
-            st.info("Sem dados para exibir.")
-            return
-        
-        chart_df = pd.DataFrame(monthly_data)
-        chart_df = chart_df.fillna(0)
-        
-        # Criar gráfico de barras simples (não empilhado) para serviço único
-        plot_data = []
-        for _, row in chart_df.iterrows():
-            month = row["Mês"]
-            value = float(row[single_service_col]) if pd.notna(row[single_service_col]) else 0.0
-            if value > 0:
-                plot_data.append({
-                    "Mês": month,
-                    "Serviço": single_service_col.replace("($)", "").strip(),
-                    "Custo": value
-                })
-        
-        if not plot_data:
+        # O PeriodIndex do cubo já está em ordem cronológica, então
+        # str(period) produz "YYYY-MM" ordenado sem reparsear datas
+        monthly = monthly_all[single_service_col]
+        plot_df = monthly.rename("Custo").reset_index()
+        plot_df["Mês"] = plot_df["Mês"].astype(str)
+        # Categoria de valor único: serialização por códigos no Plotly
+        plot_df["Serviço"] = pd.Categorical([single_service_col.replace("($)", "").strip()] * len(plot_df))
+        plot_df = plot_df[plot_df["Custo"] > 0]
+
+        if plot_df.empty:
             st.info("Sem dados para exibir.")
             return
-        
-        plot_df = pd.DataFrame(plot_data)
-        plot_df["Mês"] = pd.to_datetime(plot_df["Mês"]).dt.strftime("%Y-%m")
-        months_sorted = sorted(plot_df["Mês"].unique())
-        plot_df["Mês"] = pd.Categorical(plot_df["Mês"], categories=months_sorted, ordered=True)
-        plot_df = plot_df.sort_values("Mês")
-        
+
         # Criar gráfico de barras simples
         fig = px.bar(
             plot_df,
@@ -226,89 +325,46 @@ def render_monthly_bar_chart(cost_df: pd.DataFrame, services: Optional[List[str]
             hovertemplate="<b>%{fullData.name}</b><br>Mês: %{x}<br>Custo: $%{y:,.2f}<extra></extra>",
         )
         
-        fig.update_layout(
-            height=400,
-            xaxis=dict(title="Mês", tickangle=-45),
-            yaxis=dict(title="Custo ($)", tickformat="$,.0f"),
-            margin=dict(l=20, r=20, t=20, b=80),
-            showlegend=False,
-            barmode="group",
-        )
-        
+        fig.update_layout(uirevision="finops-monthly", **_MONTHLY_SINGLE_LAYOUT)
+
         st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
         return
     
-    # Modo empilhado: calcular totais por serviço por mês
-    monthly_data = []
-    for month in df["Mês"].unique():
-        month_df = df[df["Mês"] == month]
-        month_str = str(month)
-        
-        service_totals = {"Mês": month_str}
-        for service_col in available_service_cols:
-            if service_col in month_df.columns:
-                total = month_df[service_col].sum()
-                if pd.notna(total) and total > 0:
-                    service_totals[service_col] = float(total)
-        
-        # Adicionar mesmo se não houver serviços (para manter todos os meses)
-        monthly_data.append(service_totals)
+    # Modo empilhado: fatia do cubo compartilhado já agregado por mês
+    monthly = monthly_all[available_service_cols]
 
-    if not monthly_data:
+    if monthly.empty:
         st.info("Sem dados para exibir.")
         return
 
-    # Criar DataFrame com totais por mês e serviço
-    chart_df = pd.DataFrame(monthly_data)
-    chart_df = chart_df.fillna(0)
-
-    # Calcular totais por serviço em todo o período para identificar os top 9
-    service_totals_period = {}
-    for service_col in available_service_cols:
-        if service_col in chart_df.columns:
-            service_totals_period[service_col] = chart_df[service_col].sum()
-
-    # Ordenar serviços por total e pegar os top 9
-    sorted_services = sorted(service_totals_period.items(), key=lambda x: x[1], reverse=True)
-    top_9_services = [service for service, _ in sorted_services[:9]]
-
-    # Preparar dados para o gráfico empilhado
-    plot_data = []
-    for _, row in chart_df.iterrows():
-        month = row["Mês"]
-        others_total = 0
-        
-        # Adicionar os top 9 serviços
-        for service in top_9_services:
-            if service in row:
-                plot_data.append({
-                    "Mês": month,
-                    "Serviço": service.replace("($)", "").strip(),
-                    "Custo": float(row[service]) if pd.notna(row[service]) else 0.0
-                })
-        
-        # Calcular "Outros" (todos os serviços não incluídos nos top 9)
-        for service_col in available_service_cols:
-            if service_col not in top_9_services and service_col in row:
-                if pd.notna(row[service_col]):
-                    others_total += float(row[service_col])
-        
-        if others_total > 0:
-            plot_data.append({
-                "Mês": month,
-                "Serviço": "Outros",
-                "Custo": others_total
-            })
-
-    if not plot_data:
+    # Top 9 serviços do período e rollup vetorizado de "Outros"
+    top_9_services = monthly.sum(axis=0).nlargest(9).index
+    plot_wide = monthly[list(top_9_services)].copy()
+    others_total = monthly.drop(columns=top_9_services).sum(axis=1)
+    if (others_total > 0).any():
+        plot_wide["Outros"] = others_total
+
+    # O PeriodIndex já está em ordem cronológica: converter para string uma
+    # única vez e reutilizar essa ordem como categorias, sem reparsear datas
+    months_sorted = [str(period) for period in plot_wide.index]
+    plot_wide.index = pd.Index(months_sorted, name="Mês")
+    plot_df = plot_wide.reset_index().melt(id_vars="Mês", var_name="Serviço", value_name="Custo")
+    plot_df = plot_df[plot_df["Custo"] > 0]
+    # Categoria ordenada (top 9 -> "Outros"): o Plotly serializa códigos +
+    # categorias em vez de repetir a string por linha, e a legenda mantém a
+    # ordem de relevância
+    service_labels = list(dict.fromkeys(col.replace("($)", "").strip() for col in plot_wide.columns))
+    plot_df["Serviço"] = pd.Categorical(
+        plot_df["Serviço"].str.replace("($)", "", regex=False).str.strip(),
+        categories=service_labels,
+        ordered=True,
+    )
+
+    if plot_df.empty:
         st.info("Sem dados para exibir.")
         return
 
-    plot_df = pd.DataFrame(plot_data)
-    
-    # Ordenar meses
-    plot_df["Mês"] = pd.to_datetime(plot_df["Mês"]).dt.strftime("%Y-%m")
-    months_sorted = sorted(plot_df["Mês"].unique())
+    # Ordenar meses (melt intercala serviços; a categoria restaura a ordem)
     plot_df["Mês"] = pd.Categorical(plot_df["Mês"], categories=months_sorted, ordered=True)
     plot_df = plot_df.sort_values("Mês")
 
@@ -327,20 +383,6 @@ def render_monthly_bar_chart(cost_df: pd.DataFrame, services: Optional[List[str]
         hovertemplate="<b>%{fullData.name}</b><br>Mês: %{x}<br>Custo: $%{y:,.2f}<extra></extra>",
     )
     
-    fig.update_layout(
-        height=400,
-        xaxis=dict(title="Mês", tickangle=-45),
-        yaxis=dict(title="Custo Total ($)", tickformat="$,.0f"),
-        margin=dict(l=20, r=20, t=20, b=80),
-        legend=dict(
-            orientation="v",
-            yanchor="top",
-            y=1,
-            xanchor="left",
-            x=1.02,
-            font=dict(size=10)
-        ),
-        barmode="stack",
-    )
-    
+    fig.update_layout(uirevision="finops-monthly", **_MONTHLY_STACK_LAYOUT)
+
     st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
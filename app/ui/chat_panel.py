@@ -4,8 +4,30 @@ from __future__ import annotations
 import pandas as pd
 import streamlit as st
 
+from app.config import CACHE_TTL
+from app.infra.cache import SimpleCache
 from app.services.chat_service import answer_question
 
+# Respostas de NLQ compartilhadas entre todas as sessões do processo:
+# a mesma pergunta sobre o mesmo dataset volta do cache em vez de
+# reexecutar a análise (o histórico por sessão continua no session_state)
+_ANSWER_CACHE = SimpleCache(ttl=CACHE_TTL)
+
+
+def _stream_text(text: str):
+    """Fatia a resposta pronta em palavras para o efeito incremental do write_stream."""
+    for word in text.split(" "):
+        yield word + " "
+
+
+def _cached_answer(user_query: str, cost_df: pd.DataFrame):
+    key = f"{user_query.strip().lower()}:{int(pd.util.hash_pandas_object(cost_df).sum())}"
+    hit = _ANSWER_CACHE.get(key)
+    if hit is None:
+        hit = answer_question(user_query, cost_df)
+        _ANSWER_CACHE.set(key, hit)
+    return hit
+
 
 def render_chat_panel(cost_df: pd.DataFrame) -> None:
     """Renderiza painel de chat com IA."""
@@ -56,20 +78,25 @@ def render_chat_panel(cost_df: pd.DataFrame) -> None:
             user_query = None
 
     if user_query:
-        # Adicionar pergunta ao histórico
+        # Adicionar pergunta ao histórico e exibi-la imediatamente
         st.session_state.chat_history.append({"role": "user", "content": user_query})
+        with st.chat_message("user"):
+            st.markdown(user_query)
 
-        # Gerar resposta
-        with st.spinner("Pensando..."):
-            response = answer_question(user_query, cost_df)
+        # Gerar e exibir a resposta em streaming: os tokens aparecem
+        # conforme chegam e o script não é reexecutado inteiro no envio
+        with st.chat_message("assistant"):
+            with st.spinner("Pensando..."):
+                response = _cached_answer(user_query, cost_df)
+            st.write_stream(_stream_text(response.answer_text))
+            if response.dataframe:
+                st.dataframe(pd.DataFrame(response.dataframe), use_container_width=True)
 
-        # Adicionar resposta ao histórico
+        # Adicionar resposta ao histórico (sem st.rerun: as mensagens novas
+        # já foram desenhadas acima e o histórico cobre os próximos reruns)
         response_dict = {"role": "assistant", "content": response.answer_text}
         if response.dataframe:
             response_dict["dataframe"] = response.dataframe
         st.session_state.chat_history.append(response_dict)
 
-        # Recarregar para exibir nova mensagem
-        st.rerun()
-
 
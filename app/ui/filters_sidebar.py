@@ -43,10 +43,17 @@ def render_sidebar(
     st.sidebar.markdown("---")
     st.sidebar.markdown("### Dataset ativo")
     if available_files:
+        # Rótulos montados uma única vez; o selectbox trabalha com índices e
+        # format_func, dispensando o .index() de volta sobre a lista (que
+        # ainda apontava para o primeiro arquivo em caso de rótulo repetido)
         display_options = [f"{f.filename} ({f.cloud_provider})" for f in available_files]
         safe_index = min(selected_file_index, len(display_options) - 1)
-        selected_label = st.sidebar.selectbox("Selecione o arquivo", options=display_options, index=safe_index)
-        selected_index = display_options.index(selected_label)
+        selected_index = st.sidebar.selectbox(
+            "Selecione o arquivo",
+            options=range(len(display_options)),
+            index=safe_index,
+            format_func=display_options.__getitem__,
+        )
         st.sidebar.caption(f"SQLite • {len(available_files)} arquivo(s) importado(s)")
     else:
         st.sidebar.info("Nenhum arquivo importado. Faça upload para iniciar.")
@@ -102,12 +109,8 @@ def render_sidebar(
 
 
 def _safe_date_range(period_range: Optional[Tuple[Optional[date], Optional[date]]], min_date: date, max_date: date) -> Tuple[date, date]:
-    """Garante que o range de datas seja válido."""
-    if not period_range or not all(period_range):
-        return (min_date, max_date)
-    start, end = period_range
-    start = max(start, min_date) if start else min_date
-    end = min(end, max_date) if end else max_date
-    if start > end:
-        start, end = min_date, max_date
-    return (start, end)
+    """Garante que o range de datas seja válido via clipping min/max."""
+    start, end = period_range or (None, None)
+    start = min(max(start or min_date, min_date), max_date)
+    end = min(max(end or max_date, min_date), max_date)
+    return (start, end) if start <= end else (min_date, max_date)
@@ -4,86 +4,51 @@ from __future__ import annotations
 from typing import List, Optional
 
 import pandas as pd
-import plotly.graph_objects as go
 import streamlit as st
 
 from app.services.forecast_service import calculate_monthly_totals, make_forecast
 
+# plotly e numpy entram só quando a figura é construída: sessões que não
+# visitam a aba de previsão não pagam o import no carregamento da página
 
-def render_forecast_panel(cost_df: pd.DataFrame, services: Optional[List[str]] = None, horizon_months: int = 6) -> None:
-    """Renderiza painel de previsão de custos conforme especificação."""
-    # 4.1 Cabeçalho
-    st.markdown("# Previsão de Custos – FinOps Multi-Cloud")
-    
-    # Obter nome do arquivo - será passado via parâmetro ou session_state
-    # Por enquanto, usar um nome padrão ou tentar obter da sessão
-    try:
-        dataset_name = st.session_state.get("dataset_name", "Arquivo de custos")
-    except:
-        dataset_name = "Arquivo de custos"
-    st.markdown(f"### {dataset_name}")
-    
-    st.markdown(
-        "Previsão baseada no total mensal histórico usando análise de tendência linear e intervalo de confiança estatístico."
-    )
-
-    if cost_df.empty:
-        st.error("Sem dados para gerar previsão. Importe um CSV primeiro.")
-        return
-
-    # Calcular totais mensais históricos
-    historical_df = calculate_monthly_totals(cost_df)
-
-    if historical_df.empty or len(historical_df) < 2:
-        st.warning("Dados históricos insuficientes. É necessário pelo menos 2 meses de dados para gerar previsões.")
-        return
-
-    # Aviso se série histórica muito curta
-    if len(historical_df) < 3:
-        st.warning("⚠️ A série histórica é muito curta, portanto o forecast é meramente indicativo.")
-
-    # Gerar forecast
-    with st.spinner("Calculando previsões..."):
-        forecast_df, stats = make_forecast(cost_df, horizon=horizon_months)
+# Layout estático construído uma vez no import; o uirevision estável deixa
+# o Plotly.js preservar zoom/pan e diffar em vez de redesenhar no rerun
+_FORECAST_LAYOUT = dict(
+    title="",
+    xaxis_title="Mês",
+    yaxis_title="Custo Total ($)",
+    height=450,
+    hovermode="x unified",
+    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    xaxis=dict(showgrid=True, gridcolor="#E5E7EB"),
+    yaxis=dict(showgrid=True, gridcolor="#E5E7EB", tickformat="$,.0f"),
+)
 
-    if forecast_df is None or stats is None:
-        st.error("Não foi possível gerar previsões. Verifique os dados.")
-        return
 
-    # 4.2 Cards de métricas
-    st.markdown("---")
-    
-    mean_forecast = forecast_df["forecast"].mean()
-    total_forecast = forecast_df["forecast"].sum()
-    variation_pct = ((mean_forecast / stats.mean_cost - 1) * 100) if stats.mean_cost > 0 else 0
-
-    col1, col2, col3, col4 = st.columns(4)
+def _hash_frame(df: pd.DataFrame) -> bytes:
+    """Hash dos valores do frame (histórico/forecast são séries pequenas)."""
+    return pd.util.hash_pandas_object(df, index=True).values.tobytes()
 
-    with col1:
-        st.metric("Média Histórica", f"${stats.mean_cost:,.2f}")
 
-    with col2:
-        st.metric("Média Prevista (6 meses)", f"${mean_forecast:,.2f}")
-
-    with col3:
-        st.metric("Total Previsto (6 meses)", f"${total_forecast:,.2f}")
-
-    with col4:
-        # Variação com cor verde se positiva, vermelha se negativa
-        delta_color = "normal" if variation_pct >= 0 else "inverse"
-        st.metric("Variação Média (%)", f"{variation_pct:+.2f}%", delta=f"{variation_pct:+.2f}%", delta_color=delta_color)
-
-    # 4.3 Gráfico principal
-    st.markdown("---")
-    st.markdown("### Evolução e Previsão de Custos Mensais")
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_forecast_fig(historical_df: pd.DataFrame, forecast_df: pd.DataFrame) -> "go.Figure":
+    import numpy as np
+    import plotly.graph_objects as go
 
+    # Figura construída uma vez por (histórico, previsão); reruns do
+    # Streamlit com os mesmos dados reutilizam o go.Figure do cache
     fig = go.Figure()
 
+    # Arrays NumPy tipados (float32 / datetime64[ms]) ativam o caminho
+    # binário do Plotly, encolhendo o payload serializado para o navegador
+    historical_x = historical_df["date"].to_numpy().astype("datetime64[ms]")
+    forecast_x = forecast_df["month"].to_numpy().astype("datetime64[ms]")
+
     # Linha azul sólida: custos históricos
     fig.add_trace(
         go.Scatter(
-            x=historical_df["date"],
-            y=historical_df["cost"],
+            x=historical_x,
+            y=historical_df["cost"].to_numpy(dtype=np.float32),
             mode="lines+markers",
             name="Histórico Real",
             line=dict(color="#2563EB", width=3),
@@ -94,8 +59,8 @@ def render_forecast_panel(cost_df: pd.DataFrame, services: Optional[List[str]] =
     # Linha vermelha tracejada: previsões
     fig.add_trace(
         go.Scatter(
-            x=forecast_df["month"],
-            y=forecast_df["forecast"],
+            x=forecast_x,
+            y=forecast_df["forecast"].to_numpy(dtype=np.float32),
             mode="lines+markers",
             name="Previsão",
             line=dict(color="#DC2626", width=3, dash="dash"),
@@ -106,8 +71,8 @@ def render_forecast_panel(cost_df: pd.DataFrame, services: Optional[List[str]] =
     # Faixa de intervalo de confiança (área preenchida)
     fig.add_trace(
         go.Scatter(
-            x=forecast_df["month"],
-            y=forecast_df["upper"],
+            x=forecast_x,
+            y=forecast_df["upper"].to_numpy(dtype=np.float32),
             mode="lines",
             name="Limite Superior",
             line=dict(width=0),
@@ -117,8 +82,8 @@ def render_forecast_panel(cost_df: pd.DataFrame, services: Optional[List[str]] =
     )
     fig.add_trace(
         go.Scatter(
-            x=forecast_df["month"],
-            y=forecast_df["lower"],
+            x=forecast_x,
+            y=forecast_df["lower"].to_numpy(dtype=np.float32),
             mode="lines",
             name="Intervalo de Confiança",
             fill="tonexty",
@@ -128,7 +93,10 @@ def render_forecast_panel(cost_df: pd.DataFrame, services: Optional[List[str]] =
         )
     )
 
-    # Linha vertical pontilhada marcando "Início da Previsão"
+    # Linha vertical pontilhada marcando "Início da Previsão". Mantido o
+    # par add_shape + add_annotation: add_vline com annotation_text soma
+    # os limites x para ancorar a anotação e isso levanta TypeError com
+    # eixo de datas no plotly atual
     last_historical_date = historical_df["date"].max()
     fig.add_shape(
         type="line",
@@ -150,34 +118,93 @@ def render_forecast_panel(cost_df: pd.DataFrame, services: Optional[List[str]] =
         font=dict(size=10, color="gray"),
     )
 
-    fig.update_layout(
-        title="",
-        xaxis_title="Mês",
-        yaxis_title="Custo Total ($)",
-        height=450,
-        hovermode="x unified",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-        xaxis=dict(showgrid=True, gridcolor="#E5E7EB"),
-        yaxis=dict(showgrid=True, gridcolor="#E5E7EB", tickformat="$,.0f"),
+    fig.update_layout(uirevision="finops-forecast", **_FORECAST_LAYOUT)
+
+    return fig
+
+
+def render_forecast_panel(cost_df: pd.DataFrame, services: Optional[List[str]] = None, horizon_months: int = 6) -> None:
+    """Renderiza painel de previsão de custos conforme especificação."""
+    # 4.1 Cabeçalho
+    st.markdown("# Previsão de Custos – FinOps Multi-Cloud")
+    
+    # Obter nome do arquivo - será passado via parâmetro ou session_state
+    # Por enquanto, usar um nome padrão ou tentar obter da sessão
+    try:
+        dataset_name = st.session_state.get("dataset_name", "Arquivo de custos")
+    except:
+        dataset_name = "Arquivo de custos"
+    st.markdown(f"### {dataset_name}")
+    
+    st.markdown(
+        "Previsão baseada no total mensal histórico usando análise de tendência linear e intervalo de confiança estatístico."
     )
 
+    if cost_df.empty:
+        st.error("Sem dados para gerar previsão. Importe um CSV primeiro.")
+        return
+
+    # Calcular totais mensais históricos
+    historical_df = calculate_monthly_totals(cost_df)
+
+    if historical_df.empty or len(historical_df) < 2:
+        st.warning("Dados históricos insuficientes. É necessário pelo menos 2 meses de dados para gerar previsões.")
+        return
+
+    # Aviso se série histórica muito curta
+    if len(historical_df) < 3:
+        st.warning("⚠️ A série histórica é muito curta, portanto o forecast é meramente indicativo.")
+
+    # Gerar forecast
+    with st.spinner("Calculando previsões..."):
+        forecast_df, stats = make_forecast(cost_df, horizon=horizon_months)
+
+    if forecast_df is None or stats is None:
+        st.error("Não foi possível gerar previsões. Verifique os dados.")
+        return
+
+    # 4.2 Cards de métricas
+    st.markdown("---")
+    
+    mean_forecast = forecast_df["forecast"].mean()
+    total_forecast = forecast_df["forecast"].sum()
+    variation_pct = ((mean_forecast / stats.mean_cost - 1) * 100) if stats.mean_cost > 0 else 0
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Média Histórica", f"${stats.mean_cost:,.2f}")
+
+    with col2:
+        st.metric("Média Prevista (6 meses)", f"${mean_forecast:,.2f}")
+
+    with col3:
+        st.metric("Total Previsto (6 meses)", f"${total_forecast:,.2f}")
+
+    with col4:
+        # Variação com cor verde se positiva, vermelha se negativa
+        delta_color = "normal" if variation_pct >= 0 else "inverse"
+        st.metric("Variação Média (%)", f"{variation_pct:+.2f}%", delta=f"{variation_pct:+.2f}%", delta_color=delta_color)
+
+    # 4.3 Gráfico principal
+    st.markdown("---")
+    st.markdown("### Evolução e Previsão de Custos Mensais")
+
+    fig = _build_forecast_fig(historical_df, forecast_df)
     st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
 
     # 4.4 Tabela "Previsões detalhadas por mês"
     st.markdown("---")
     st.markdown("### Previsões Detalhadas por Mês")
 
-    # Preparar tabela para exibição
-    display_df = forecast_df.copy()
-    display_df["Mês"] = display_df["month"].dt.strftime("%Y-%m")
-    display_df["Previsão ($)"] = display_df["forecast"].apply(lambda x: f"${x:,.2f}")
-    display_df["Limite Inferior ($)"] = display_df["lower"].apply(lambda x: f"${x:,.2f}")
-    display_df["Limite Superior ($)"] = display_df["upper"].apply(lambda x: f"${x:,.2f}")
-
-    # Selecionar apenas colunas de exibição
-    display_df = display_df[["Mês", "Previsão ($)", "Limite Inferior ($)", "Limite Superior ($)"]]
+    # Preparar tabela para exibição: colunas numéricas seguem numéricas e o
+    # Styler formata só na renderização, sem .apply Python linha a linha
+    display_df = forecast_df.assign(**{"Mês": forecast_df["month"].dt.strftime("%Y-%m")})[
+        ["Mês", "forecast", "lower", "upper"]
+    ].rename(columns={"forecast": "Previsão ($)", "lower": "Limite Inferior ($)", "upper": "Limite Superior ($)"})
 
-    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    money_format = {col: "${:,.2f}" for col in ("Previsão ($)", "Limite Inferior ($)", "Limite Superior ($)")}
+    st.dataframe(display_df.style.format(money_format), use_container_width=True, hide_index=True)
 
     # Informações adicionais
     st.caption("💡 Estatísticas: Média histórica = ${:.2f}, Desvio padrão = ${:.2f}, Mínimo = ${:.2f}, Máximo = ${:.2f}".format(
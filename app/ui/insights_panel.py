@@ -7,8 +7,29 @@ import streamlit as st
 from app.services.insights_service import generate_insights
 
 
-def render_insights_panel(cost_df: pd.DataFrame, kpi_summary: dict) -> None:
-    """Renderiza painel de insights automáticos."""
+def _frame_digest(df: pd.DataFrame) -> tuple:
+    """Assinatura barata do frame para a chave de cache (shape + colunas + soma)."""
+    return (df.shape, tuple(df.columns), float(df.select_dtypes("number").to_numpy().sum()))
+
+
+@st.cache_data(ttl=3600, show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def _cached_insights(cost_df: pd.DataFrame, kpi_items: tuple) -> str:
+    """Gera (ou reaproveita) o texto de insights para o recorte atual.
+
+    A chave combina o digest do frame com os KPIs achatados em tupla:
+    reruns que não mudam o recorte devolvem o texto pronto sem refazer
+    as agregações do serviço.
+    """
+    return generate_insights(cost_df, dict(kpi_items))
+
+
+def render_insights_panel(cost_df: pd.DataFrame, kpi_items: tuple) -> None:
+    """Renderiza painel de insights automáticos.
+
+    Args:
+        cost_df: DataFrame de custos filtrado.
+        kpi_items: Pares (campo, valor) de KPISummary.as_cache_key().
+    """
     st.markdown("### Insights Automáticos")
     st.caption("Análise executiva gerada automaticamente por IA sobre os custos do período")
 
@@ -17,7 +38,7 @@ def render_insights_panel(cost_df: pd.DataFrame, kpi_summary: dict) -> None:
         return
 
     with st.spinner("Gerando insights..."):
-        insights_text = generate_insights(cost_df, kpi_summary)
+        insights_text = _cached_insights(cost_df, kpi_items)
 
     st.markdown(insights_text)
 
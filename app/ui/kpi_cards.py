@@ -26,18 +26,16 @@ def render_kpi_row(kpi_summary: KPISummary) -> None:
         ("Mês com menor gasto", kpi_summary.lowest_month or "-", "Vale mensal"),
     ]
 
-    for row in (kpis[:4], kpis[4:]):
-        cols = st.columns(4)
-        for col, (label, value, subtitle) in zip(cols, row):
-            with col:
-                st.markdown(
-                    f"""
-                    <div class="kpi-card">
-                        <h3>{label.upper()}</h3>
-                        <div class="kpi-value">{value}</div>
-                        <div class="kpi-footnote">{subtitle}</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
+    # Grade 2x4 emitida como um único st.markdown: o HTML é estático, então
+    # oito cards em st.columns viravam oito componentes markdown por rerun
+    # sem necessidade — o layout fica por conta do .kpi-grid (CSS global)
+    cards = "".join(
+        f'<div class="kpi-card">'
+        f"<h3>{label.upper()}</h3>"
+        f'<div class="kpi-value">{value}</div>'
+        f'<div class="kpi-footnote">{subtitle}</div>'
+        f"</div>"
+        for label, value, subtitle in kpis
+    )
+    st.markdown(f'<div class="kpi-grid">{cards}</div>', unsafe_allow_html=True)
 
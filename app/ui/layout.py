@@ -9,10 +9,7 @@ from app.data.repositories import get_cost_ranking, get_monthly_totals, get_perc
 from app.ui import anomaly_panel, chat_panel, charts, forecast_panel, insights_panel, kpi_cards, recommendation_panel
 
 
-def inject_global_css() -> None:
-    """Injeta CSS global para estilização."""
-    st.markdown(
-        """
+_GLOBAL_CSS = """
         <style>
             @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
 
@@ -83,6 +80,12 @@ def inject_global_css() -> None:
                 color: var(--text-primary);
             }
 
+            .kpi-grid {
+                display: grid;
+                grid-template-columns: repeat(4, 1fr);
+                gap: 1rem;
+            }
+
             .kpi-card {
                 background: var(--card-bg);
                 border: 1px solid var(--card-border);
@@ -126,10 +129,41 @@ def inject_global_css() -> None:
                 font-size: 0.85rem;
                 margin-top: 0.2rem;
             }
+
+            .rec-card {
+                background: var(--card-bg);
+                border: 1px solid var(--card-border);
+                border-radius: 16px;
+                padding: 1rem 1.2rem;
+                margin-bottom: 1rem;
+            }
+
+            .rec-card h4 {
+                margin: 0 0 0.3rem 0;
+                color: var(--text-primary);
+            }
+
+            .rec-card .rec-meta {
+                font-size: 0.85rem;
+                color: var(--text-secondary);
+                margin: 0 0 0.3rem 0;
+            }
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+# Minificação única no import: o bloco é estático, então o strip de
+# indentação/linhas vazias roda uma vez e cada rerun envia menos bytes
+_GLOBAL_CSS = "".join(line.strip() for line in _GLOBAL_CSS.splitlines())
+
+
+def inject_global_css() -> None:
+    """Injeta CSS global para estilização.
+
+    O bloco precisa ser reemitido em todo rerun — elementos que o script
+    não emite são removidos da página pelo Streamlit — mas a string já
+    chega pronta do import, sem remontagem por chamada.
+    """
+    st.markdown(_GLOBAL_CSS, unsafe_allow_html=True)
 
 
 def render_header(dataset_name: str, data_source_label: str, period_label: str) -> None:
@@ -148,6 +182,34 @@ def render_header(dataset_name: str, data_source_label: str, period_label: str)
     )
 
 
+TAB_NAMES = ["Detalhes", "Tabelas", "Insights IA", "Previsão", "Anomalias", "Recomendações", "Chat IA"]
+
+# Limite de linhas enviadas ao st.dataframe: o Streamlit serializa o frame
+# inteiro para Arrow mesmo com o viewport mostrando ~20 linhas
+PREVIEW_ROWS = 500
+
+
+def _frame_digest(df: pd.DataFrame) -> tuple:
+    """Assinatura barata do frame para a chave de cache (shape + colunas + soma)."""
+    return (df.shape, tuple(df.columns), float(df.select_dtypes("number").to_numpy().sum()))
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def _ranking_and_distribution(cost_df: pd.DataFrame, services: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Ranking e distribuição percentual calculados uma única vez por recorte.
+
+    Detalhes e Tabelas consomem as mesmas duas agregações; o cache evita
+    refazer o groupby/sort a cada coluna e a cada troca de aba.
+    """
+    return get_cost_ranking(cost_df, services), get_percentual_distribution(cost_df, services)
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    """Serializa o frame para download sem refazer o CSV a cada rerun."""
+    return df.to_csv(index=False).encode("utf-8")
+
+
 def render_main_content(
     cost_df: pd.DataFrame,
     kpi_summary: KPISummary,
@@ -155,91 +217,115 @@ def render_main_content(
     chart_column: str,
 ) -> None:
     """Renderiza conteúdo principal com abas."""
-    tabs = st.tabs(["Detalhes", "Tabelas", "Insights IA", "Previsão", "Anomalias", "Recomendações", "Chat IA"])
-
-    with tabs[0]:  # Detalhes
-        kpi_cards.render_kpi_row(kpi_summary)
-        st.markdown("<br>", unsafe_allow_html=True)
-
-        # Gráficos
-        col1, col2 = st.columns(2, gap="large")
-
-        with col1:
-            with st.container(border=True):
-                st.markdown('<p class="section-title">Ranking de Custos</p>', unsafe_allow_html=True)
-                ranking_df = get_cost_ranking(cost_df, services)
-                charts.render_ranking_chart(ranking_df)
-                st.markdown('<p class="chart-caption">Ordena os serviços pelos maiores custos agregados.</p>', unsafe_allow_html=True)
-
-        with col2:
-            with st.container(border=True):
-                st.markdown('<p class="section-title">Distribuição Percentual</p>', unsafe_allow_html=True)
-                ranking_df = get_cost_ranking(cost_df, services)
-                percentual_df = get_percentual_distribution(cost_df, services)
-                # Passar número de itens do ranking para ajustar altura do gráfico de pizza
-                ranking_count = len(ranking_df) if not ranking_df.empty else 0
-                charts.render_distribution_chart(percentual_df, ranking_count=ranking_count)
-                st.markdown('<p class="chart-caption">Mostra a participação relativa dos 10 principais serviços e demais agrupados como "Outros".</p>', unsafe_allow_html=True)
-
-        st.markdown("<br>", unsafe_allow_html=True)
-        
-        # Gráficos de evolução mensal em duas colunas
-        col3, col4 = st.columns(2, gap="large")
-        
-        with col3:
-            with st.container(border=True):
-                st.markdown('<p class="section-title" style="margin-bottom:0.25rem;">Total Gasto por Mês</p>', unsafe_allow_html=True)
-                # Passar serviços filtrados e coluna selecionada para comportamento interativo
-                charts.render_monthly_bar_chart(cost_df, services=services, chart_column=chart_column)
-                if chart_column and chart_column != "Custos totais($)":
-                    st.markdown('<p class="chart-caption">Exibindo apenas o serviço selecionado. Selecione "Custos totais($)" para ver a composição completa.</p>', unsafe_allow_html=True)
-                else:
-                    st.markdown('<p class="chart-caption">Total gasto em cada mês dividido pelos 9 serviços com maior gasto e "Outros". Selecione um serviço específico para análise detalhada.</p>', unsafe_allow_html=True)
-        
-        with col4:
-            with st.container(border=True):
-                st.markdown('<p class="section-title" style="margin-bottom:0.25rem;">Evolução Mensal de Custos</p>', unsafe_allow_html=True)
-                monthly_totals = get_monthly_totals(cost_df, services=[chart_column] if chart_column in cost_df.columns else None)
-                charts.render_evolution_chart(monthly_totals, chart_column)
-                st.markdown('<p class="chart-caption">Série temporal baseada na coluna selecionada para gráficos.</p>', unsafe_allow_html=True)
-
-        # Dados filtrados
-        st.markdown("<br>", unsafe_allow_html=True)
-        st.markdown("### Dados filtrados")
-        if cost_df.empty:
-            st.info("Sem dados para exibir. Importe um CSV e ajuste os filtros.")
-        else:
-            st.dataframe(cost_df, use_container_width=True, height=420)
-
-    with tabs[1]:  # Tabelas
-        st.markdown("### Totais por serviço")
-        service_totals = get_cost_ranking(cost_df, services)
-        if service_totals.empty:
-            st.caption("Nenhum total disponível.")
-        else:
-            st.dataframe(service_totals, use_container_width=True, height=320)
-
-        st.markdown("### Distribuição percentual")
-        percentual_df = get_percentual_distribution(cost_df, services)
-        if percentual_df.empty:
-            st.caption("Sem dados para percentuais.")
-        else:
-            st.dataframe(percentual_df, use_container_width=True, height=320)
-
-    with tabs[2]:  # Insights IA
-        insights_panel.render_insights_panel(cost_df, kpi_summary.dict())
-
-    with tabs[3]:  # Previsão
+    # st.tabs executa o corpo de TODAS as abas em cada rerun, inclusive as
+    # ocultas — previsão, anomalias, recomendações e chat rodavam seus
+    # serviços mesmo com o usuário em Detalhes. O radio despacha apenas o
+    # painel visível; a aba ativa persiste no session_state entre reruns.
+    active_tab = st.radio("Seção", TAB_NAMES, horizontal=True, key="active_tab", label_visibility="collapsed")
+
+    if active_tab == "Detalhes":
+        _render_detalhes_tab(cost_df, kpi_summary, services, chart_column)
+    elif active_tab == "Tabelas":
+        _render_tabelas_tab(cost_df, services)
+    elif active_tab == "Insights IA":
+        # Tupla hasheável em vez de .dict(): chave pronta para o cache do
+        # painel, sem alocar dicionário por rerun
+        insights_panel.render_insights_panel(cost_df, kpi_summary.as_cache_key())
+    elif active_tab == "Previsão":
         # Passar nome do dataset via session_state
         dataset_name = st.session_state.get("dataset_name", "Arquivo de custos")
         st.session_state["dataset_name"] = dataset_name
         forecast_panel.render_forecast_panel(cost_df, services)
-
-    with tabs[4]:  # Anomalias
+    elif active_tab == "Anomalias":
         anomaly_panel.render_anomaly_panel(cost_df)
-
-    with tabs[5]:  # Recomendações
+    elif active_tab == "Recomendações":
         recommendation_panel.render_recommendation_panel(cost_df)
-
-    with tabs[6]:  # Chat IA
+    elif active_tab == "Chat IA":
         chat_panel.render_chat_panel(cost_df)
+
+
+def _render_detalhes_tab(
+    cost_df: pd.DataFrame,
+    kpi_summary: KPISummary,
+    services: list[str],
+    chart_column: str,
+) -> None:
+    kpi_cards.render_kpi_row(kpi_summary)
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # Gráficos (agregações compartilhadas pelas duas colunas)
+    ranking_df, percentual_df = _ranking_and_distribution(cost_df, services)
+    col1, col2 = st.columns(2, gap="large")
+
+    with col1:
+        with st.container(border=True):
+            st.markdown('<p class="section-title">Ranking de Custos</p>', unsafe_allow_html=True)
+            charts.render_ranking_chart(ranking_df)
+            st.markdown('<p class="chart-caption">Ordena os serviços pelos maiores custos agregados.</p>', unsafe_allow_html=True)
+
+    with col2:
+        with st.container(border=True):
+            st.markdown('<p class="section-title">Distribuição Percentual</p>', unsafe_allow_html=True)
+            # Passar número de itens do ranking para ajustar altura do gráfico de pizza
+            ranking_count = len(ranking_df) if not ranking_df.empty else 0
+            charts.render_distribution_chart(percentual_df, ranking_count=ranking_count)
+            st.markdown('<p class="chart-caption">Mostra a participação relativa dos 10 principais serviços e demais agrupados como "Outros".</p>', unsafe_allow_html=True)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # Gráficos de evolução mensal em duas colunas
+    col3, col4 = st.columns(2, gap="large")
+
+    with col3:
+        with st.container(border=True):
+            st.markdown('<p class="section-title" style="margin-bottom:0.25rem;">Total Gasto por Mês</p>', unsafe_allow_html=True)
+            # Passar serviços filtrados e coluna selecionada para comportamento interativo
+            charts.render_monthly_bar_chart(cost_df, services=services, chart_column=chart_column)
+            if chart_column and chart_column != "Custos totais($)":
+                st.markdown('<p class="chart-caption">Exibindo apenas o serviço selecionado. Selecione "Custos totais($)" para ver a composição completa.</p>', unsafe_allow_html=True)
+            else:
+                st.markdown('<p class="chart-caption">Total gasto em cada mês dividido pelos 9 serviços com maior gasto e "Outros". Selecione um serviço específico para análise detalhada.</p>', unsafe_allow_html=True)
+
+    with col4:
+        with st.container(border=True):
+            st.markdown('<p class="section-title" style="margin-bottom:0.25rem;">Evolução Mensal de Custos</p>', unsafe_allow_html=True)
+            monthly_totals = get_monthly_totals(cost_df, services=[chart_column] if chart_column in cost_df.columns else None)
+            charts.render_evolution_chart(monthly_totals, chart_column)
+            st.markdown('<p class="chart-caption">Série temporal baseada na coluna selecionada para gráficos.</p>', unsafe_allow_html=True)
+
+    # Dados filtrados
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("### Dados filtrados")
+    if cost_df.empty:
+        st.info("Sem dados para exibir. Importe um CSV e ajuste os filtros.")
+    else:
+        # Expander fechado por padrão: o conteúdo (inclusive a serialização
+        # Arrow da tabela) só é renderizado quando o usuário abre
+        with st.expander("Ver dados filtrados", expanded=False):
+            # Prévia limitada: o payload cresce linear no número de linhas e o
+            # viewport só pinta ~20 delas; o CSV completo fica no botão abaixo
+            if len(cost_df) > PREVIEW_ROWS:
+                st.caption(f"Prévia das primeiras {PREVIEW_ROWS} de {len(cost_df):,} linhas.")
+            st.dataframe(cost_df.head(PREVIEW_ROWS), use_container_width=True, height=420)
+            st.download_button(
+                "Baixar CSV completo",
+                data=_csv_bytes(cost_df),
+                file_name="custos_filtrados.csv",
+                mime="text/csv",
+            )
+
+
+def _render_tabelas_tab(cost_df: pd.DataFrame, services: list[str]) -> None:
+    service_totals, percentual_df = _ranking_and_distribution(cost_df, services)
+
+    st.markdown("### Totais por serviço")
+    if service_totals.empty:
+        st.caption("Nenhum total disponível.")
+    else:
+        st.dataframe(service_totals, use_container_width=True, height=320)
+
+    st.markdown("### Distribuição percentual")
+    if percentual_df.empty:
+        st.caption("Sem dados para percentuais.")
+    else:
+        st.dataframe(percentual_df, use_container_width=True, height=320)
@@ -4,6 +4,7 @@ from __future__ import annotations
 from datetime import date, timedelta
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
@@ -19,6 +20,10 @@ CLOUD_COLORS = {
     "total": "#111827",
 }
 
+# Limite de linhas enviadas ao st.dataframe: o Streamlit serializa o frame
+# inteiro para Arrow mesmo com o viewport mostrando ~20 linhas
+_PREVIEW_ROWS = 500
+
 
 def render_multicloud_dashboard(df_norm: pd.DataFrame) -> None:
     """Renderiza a página multicloud completa."""
@@ -81,56 +86,180 @@ def _render_global_header() -> dict:
 
 
 def _apply_filters(df: pd.DataFrame, filters: dict) -> tuple[pd.DataFrame, Tuple[Optional[date], Optional[date]], Optional[int]]:
-    filtered = df.copy()
-    if "cloud_provider" not in filtered.columns:
+    if "cloud_provider" not in df.columns:
+        # Caminho raro (frame fora do fluxo de normalize): completa o schema
+        df = df.copy()
         for column in CANONICAL_COLUMNS:
-            if column not in filtered.columns:
-                filtered[column] = None
+            if column not in df.columns:
+                df[column] = None
 
+    cloud_mask = None
     if filters["cloud"] != "Todos":
-        filtered = filtered[filtered["cloud_provider"] == filters["cloud"]]
+        cloud_mask = (df["cloud_provider"] == filters["cloud"]).to_numpy()
 
-    filtered["usage_date"] = pd.to_datetime(filtered["usage_date"], errors="coerce")
+    # normalize_costs já entrega usage_date como datetime64[ns]; o reparse
+    # só acontece no caminho raro de frames fora do fluxo de normalize
+    usage_dates = df["usage_date"]
+    if not pd.api.types.is_datetime64_any_dtype(usage_dates):
+        usage_dates = pd.to_datetime(usage_dates, errors="coerce")
     start_date, end_date, days_count = compute_date_window(
         filters.get("period", "3m"),
-        filtered["usage_date"],
+        usage_dates if cloud_mask is None else usage_dates[cloud_mask],
         filters.get("custom_range"),
     )
 
+    date_values = usage_dates.to_numpy()
+    if df.attrs.get("sorted_by") == "usage_date" and usage_dates is df["usage_date"]:
+        # Coluna pré-ordenada no ingest: a janela vira uma busca binária
+        # (O(log n)) e um slice contíguo, sem máscara de data alocada
+        lo = int(np.searchsorted(date_values, np.datetime64(start_date), side="left")) if start_date else 0
+        hi = int(np.searchsorted(date_values, np.datetime64(end_date), side="right")) if end_date else len(date_values)
+        filtered = df.iloc[lo:hi]
+        if cloud_mask is not None:
+            filtered = filtered[cloud_mask[lo:hi]]
+        return filtered, (start_date, end_date), days_count
+
+    # Caminho genérico (frame sem garantia de ordenação): máscara única
+    mask = np.ones(len(df), dtype=bool) if cloud_mask is None else cloud_mask
     if start_date:
-        filtered = filtered[filtered["usage_date"] >= pd.to_datetime(start_date)]
+        mask = mask & (date_values >= np.datetime64(start_date))
     if end_date:
-        filtered = filtered[filtered["usage_date"] <= pd.to_datetime(end_date)]
+        mask = mask & (date_values <= np.datetime64(end_date))
+
+    filtered = df.loc[mask]
+    if filtered["usage_date"].dtype != usage_dates.dtype:
+        filtered = filtered.assign(usage_date=usage_dates[mask])
 
     return filtered, (start_date, end_date), days_count
 
 
-@st.cache_data(show_spinner=False)
+def _frame_digest(df: pd.DataFrame) -> tuple:
+    """Assinatura barata do frame filtrado para a chave de cache.
+
+    O hash recursivo padrão do st.cache_data percorre o DataFrame inteiro a
+    cada rerun; shape + colunas + soma de custos identificam o recorte
+    (cloud, período) com uma única redução vetorizada.
+    """
+    return (df.shape, tuple(df.columns), float(df["cost_amount"].sum()) if "cost_amount" in df.columns else 0.0)
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    """Serializa o frame para download sem refazer o CSV a cada rerun."""
+    return df.to_csv(index=False).encode("utf-8")
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
 def _compute_multicloud_aggregations(
     df: pd.DataFrame,
     period_tuple: Tuple[Optional[date], Optional[date]],
     days_count: Optional[int],
 ) -> dict:
     # O cache considera o dataframe + range selecionado
-    kpis = mc.get_kpis(df, period_tuple, period_days=days_count)
     anomalies = mc.detect_anomalies(df)
+    # Cubo base (mês × cloud × categoria × serviço) calculado uma vez; todas
+    # as demais agregações reagrupam esse intermediário já reduzido. A matriz
+    # mês × cloud alimenta KPIs, tendência e share por somas de eixo.
+    base = mc.build_base_cube(df)
+    matrix = mc.build_monthly_cloud_matrix(base)
     return {
-        "kpis": kpis,
-        "monthly_trend": mc.get_monthly_trend(df),
-        "top_services": mc.get_top_services(df),
-        "treemap": mc.get_treemap_data(df),
+        "kpis": mc.get_kpis(df, period_tuple, period_days=days_count, matrix=matrix),
+        "monthly_trend": mc.get_monthly_trend(df, base=base, matrix=matrix),
+        "top_services": mc.get_top_services(df, base=base),
+        "treemap": mc.get_treemap_data(df, base=base),
         "stacked": {
-            "cloud": mc.get_monthly_stacked(df, "cloud"),
-            "category": mc.get_monthly_stacked(df, "category"),
+            "cloud": mc.get_monthly_stacked(df, "cloud", base=base),
+            "category": mc.get_monthly_stacked(df, "category", base=base),
         },
-        "cloud_share": mc.get_cloud_share(df),
-        "category_matrix": mc.get_category_cloud_matrix(df),
-        "category_summary": mc.get_treemap_summary(df),
+        "cloud_share": mc.get_cloud_share(df, base=base, matrix=matrix),
+        "category_matrix": mc.get_category_cloud_matrix(df, base=base),
+        "category_summary": mc.get_treemap_summary(df, base=base),
         "anomalies": anomalies,
-        "insights": mc.generate_insights(df, anomalies),
+        "insights": mc.generate_insights(df, anomalies, base=base),
     }
 
 
+def _hash_frame(df: pd.DataFrame) -> bytes:
+    """Hash exato dos agregados (frames pequenos) para as chaves de cache."""
+    return pd.util.hash_pandas_object(df, index=True).values.tobytes()
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_trend_fig(monthly_trend: pd.DataFrame):
+    value_columns = [col for col in monthly_trend.columns if col not in {"month"}]
+    fig = px.line(
+        monthly_trend,
+        x="month",
+        y=value_columns,
+        markers=True,
+        color_discrete_map={**CLOUD_COLORS},
+    )
+    fig.update_layout(margin=dict(l=10, r=10, t=10, b=10), hovermode="x unified", uirevision="mc-trend")
+    return fig
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_treemap_fig(treemap_df: pd.DataFrame):
+    # O px.treemap não agrupa hierarquias com dtype categórico não-ordenado;
+    # o frame aqui é pequeno (top-k + "Outros"), então o cast é barato
+    treemap_df = treemap_df.assign(
+        **{col: treemap_df[col].astype(str) for col in ("cloud_provider", "service_category", "service_name")}
+    )
+    fig = px.treemap(
+        treemap_df,
+        path=["cloud_provider", "service_category", "service_name"],
+        values="cost_amount",
+        color="cloud_provider",
+        color_discrete_map=CLOUD_COLORS,
+    )
+    fig.update_layout(margin=dict(l=0, r=0, t=30, b=0), uirevision="mc-treemap")
+    return fig
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_top_services_fig(top_services: pd.DataFrame):
+    fig = px.bar(
+        top_services.sort_values("cost_amount"),
+        x="cost_amount",
+        y="service_name",
+        orientation="h",
+        color="cloud_provider",
+        color_discrete_map=CLOUD_COLORS,
+    )
+    fig.update_layout(margin=dict(l=0, r=0, t=30, b=0), uirevision="mc-top-services")
+    return fig
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_stacked_fig(stacked_df: pd.DataFrame):
+    value_columns = [col for col in stacked_df.columns if col not in {"month"}]
+    melted = stacked_df.melt(id_vars="month", value_vars=value_columns, var_name="Serie", value_name="Custo")
+    fig = px.bar(
+        melted,
+        x="month",
+        y="Custo",
+        color="Serie",
+        barmode="stack",
+    )
+    fig.update_layout(margin=dict(l=10, r=10, t=20, b=10), uirevision="mc-stacked")
+    return fig
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _build_heatmap_fig(matrix_df: pd.DataFrame):
+    heatmap_source = matrix_df.set_index("service_category").reindex(columns=["AWS", "OCI", "AZURE"], fill_value=0)
+    fig = px.imshow(
+        heatmap_source,
+        aspect="auto",
+        text_auto=".0f",
+        color_continuous_scale="Blues",
+        labels=dict(color="USD"),
+    )
+    fig.update_layout(margin=dict(l=10, r=10, t=10, b=10), uirevision="mc-heatmap")
+    return fig
+
+
+@st.fragment
 def _render_overview_section(aggregations: dict) -> None:
     kpis = aggregations["kpis"]
     cloud_share = aggregations["cloud_share"]
@@ -155,18 +284,12 @@ def _render_overview_section(aggregations: dict) -> None:
     if monthly_trend.empty:
         st.caption("Sem dados suficientes para tendência.")
     else:
-        value_columns = [col for col in monthly_trend.columns if col not in {"month"}]
-        fig = px.line(
-            monthly_trend,
-            x="month",
-            y=value_columns,
-            markers=True,
-            color_discrete_map={**CLOUD_COLORS},
-        )
-        fig.update_layout(margin=dict(l=10, r=10, t=10, b=10), hovermode="x unified")
-        st.plotly_chart(fig, use_container_width=True)
+        # Figuras montadas em builders com st.cache_data: rerun com o mesmo
+        # agregado reaproveita a figura pronta em vez de refazer o JSON
+        st.plotly_chart(_build_trend_fig(monthly_trend), use_container_width=True)
 
 
+@st.fragment
 def _render_distribution_section(aggregations: dict) -> None:
     treemap_df = aggregations["treemap"]
     top_services = aggregations["top_services"]
@@ -179,33 +302,17 @@ def _render_distribution_section(aggregations: dict) -> None:
         if treemap_df.empty:
             st.caption("Sem dados para treemap.")
         else:
-            fig = px.treemap(
-                treemap_df,
-                path=["cloud_provider", "service_category", "service_name"],
-                values="cost_amount",
-                color="cloud_provider",
-                color_discrete_map=CLOUD_COLORS,
-            )
-            fig.update_layout(margin=dict(l=0, r=0, t=30, b=0))
-            st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+            st.plotly_chart(_build_treemap_fig(treemap_df), use_container_width=True, config={"displayModeBar": False})
 
     with col2:
         st.markdown("##### Top serviços")
         if top_services.empty:
             st.caption("Sem serviços ranqueados.")
         else:
-            fig = px.bar(
-                top_services.sort_values("cost_amount"),
-                x="cost_amount",
-                y="service_name",
-                orientation="h",
-                color="cloud_provider",
-                color_discrete_map=CLOUD_COLORS,
-            )
-            fig.update_layout(margin=dict(l=0, r=0, t=30, b=0))
-            st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+            st.plotly_chart(_build_top_services_fig(top_services), use_container_width=True, config={"displayModeBar": False})
 
 
+@st.fragment
 def _render_finops_breakdown(filtered_df: pd.DataFrame, aggregations: dict) -> None:
     st.subheader("FinOps Breakdown")
     stack_option = st.radio("Stack por", ["Cloud", "Categoria"], horizontal=True)
@@ -215,17 +322,7 @@ def _render_finops_breakdown(filtered_df: pd.DataFrame, aggregations: dict) -> N
     if stacked_df.empty:
         st.caption("Sem dados para composição empilhada.")
     else:
-        value_columns = [col for col in stacked_df.columns if col not in {"month"}]
-        melted = stacked_df.melt(id_vars="month", value_vars=value_columns, var_name="Serie", value_name="Custo")
-        fig = px.bar(
-            melted,
-            x="month",
-            y="Custo",
-            color="Serie",
-            barmode="stack",
-        )
-        fig.update_layout(margin=dict(l=10, r=10, t=20, b=10))
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_build_stacked_fig(stacked_df), use_container_width=True)
 
     summary = aggregations["category_summary"]
     if summary.empty:
@@ -238,6 +335,7 @@ def _render_finops_breakdown(filtered_df: pd.DataFrame, aggregations: dict) -> N
             cols[idx % len(cols)].metric(row["service_category"].title(), f"{pct:.1f}%", f"USD {row['cost_amount']:,.0f}")
 
 
+@st.fragment
 def _render_comparativo_section(aggregations: dict) -> None:
     st.subheader("Comparativo Multicloud")
     matrix_df = aggregations["category_matrix"]
@@ -245,26 +343,22 @@ def _render_comparativo_section(aggregations: dict) -> None:
         st.caption("Sem dados para matriz categoria x cloud.")
         return
 
-    display_df = matrix_df.copy()
-    for cloud in ["AWS", "OCI", "AZURE"]:
-        if cloud in display_df.columns:
-            display_df[cloud] = display_df[cloud].map(lambda value: f"USD {value:,.0f}")
-    st.dataframe(display_df, use_container_width=True)
-
-    heatmap_source = matrix_df.set_index("service_category")
-    if not heatmap_source.empty:
-        heatmap_source = heatmap_source.reindex(columns=["AWS", "OCI", "AZURE"], fill_value=0)
-        fig = px.imshow(
-            heatmap_source,
-            aspect="auto",
-            text_auto=".0f",
-            color_continuous_scale="Blues",
-            labels=dict(color="USD"),
-        )
-        fig.update_layout(margin=dict(l=10, r=10, t=10, b=10))
-        st.plotly_chart(fig, use_container_width=True)
+    # Frame numérico direto ao st.dataframe: o column_config formata no
+    # frontend, sem a cópia + um lambda Python por célula de antes
+    st.dataframe(
+        matrix_df,
+        use_container_width=True,
+        column_config={
+            cloud: st.column_config.NumberColumn(format="USD %.0f")
+            for cloud in ["AWS", "OCI", "AZURE"]
+            if cloud in matrix_df.columns
+        },
+    )
+
+    st.plotly_chart(_build_heatmap_fig(matrix_df), use_container_width=True)
 
 
+@st.fragment
 def _render_anomalies_section(aggregations: dict) -> None:
     st.subheader("Anomalias & Insights")
     anomalies = aggregations["anomalies"]
@@ -276,10 +370,17 @@ def _render_anomalies_section(aggregations: dict) -> None:
         if anomalies.empty:
             st.caption("Nenhuma anomalia identificada pelas regras atuais.")
         else:
-            data = anomalies.copy()
-            data["variation_pct"] = data["variation_pct"].map(lambda v: f"{v:.1f}%")
-            data["cost_amount"] = data["cost_amount"].map(lambda v: f"USD {v:,.0f}")
-            st.dataframe(data, use_container_width=True, height=240)
+            # Formatação delegada ao column_config: o frontend formata a
+            # partir dos arrays numéricos, sem lambda Python por linha
+            st.dataframe(
+                anomalies,
+                use_container_width=True,
+                height=240,
+                column_config={
+                    "variation_pct": st.column_config.NumberColumn(format="%.1f%%"),
+                    "cost_amount": st.column_config.NumberColumn(format="USD %.0f"),
+                },
+            )
 
     with col2:
         st.markdown("##### Insights")
@@ -287,32 +388,81 @@ def _render_anomalies_section(aggregations: dict) -> None:
             st.info(f"💡 {insight}")
 
 
+def _filter_options(series: pd.Series) -> list:
+    """Rótulos distintos de uma coluna de filtro, em ordem alfabética.
+
+    Colunas categóricas (padrão pós-normalize) entregam os rótulos direto
+    de .cat.categories — só os códigos inteiros são varridos, não as
+    strings; o fallback cobre frames em que o dtype regrediu para object
+    (ex.: concat de arquivos com categorias distintas).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return sorted(series.cat.remove_unused_categories().cat.categories)
+    return sorted(series.dropna().unique())
+
+
+def _isin_mask(series: pd.Series, selection: list) -> "np.ndarray":
+    """Máscara de pertencimento calculada sobre códigos inteiros.
+
+    Em colunas categóricas o teste roda com np.isin sobre .cat.codes —
+    comparação de inteiros em vez de hashing de uma string por linha.
+    Seleções que não existem nas categorias saem do conjunto permitido
+    (get_indexer devolve -1 para elas, o mesmo código dos NaN).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        allowed = series.cat.categories.get_indexer(pd.Index(selection))
+        return np.isin(series.cat.codes.to_numpy(), allowed[allowed >= 0])
+    return series.isin(selection).to_numpy()
+
+
+@st.fragment
 def _render_operational_table(df: pd.DataFrame) -> None:
     st.subheader("Detalhamento Operacional")
     col1, col2, col3, col4 = st.columns(4)
 
-    services = sorted(df["service_name"].dropna().unique())
-    categories = sorted(df["service_category"].dropna().unique())
-    accounts = sorted(df["account_scope"].dropna().unique())
-    regions = sorted(df["region"].dropna().unique())
+    services = _filter_options(df["service_name"])
+    categories = _filter_options(df["service_category"])
+    accounts = _filter_options(df["account_scope"])
+    regions = _filter_options(df["region"])
 
     selected_services = col1.multiselect("Serviço", services)
     selected_categories = col2.multiselect("Categoria", categories)
     selected_accounts = col3.multiselect("Account / Compartment", accounts)
     selected_regions = col4.multiselect("Região", regions)
 
-    filtered = df.copy()
-    if selected_services:
-        filtered = filtered[filtered["service_name"].isin(selected_services)]
-    if selected_categories:
-        filtered = filtered[filtered["service_category"].isin(selected_categories)]
-    if selected_accounts:
-        filtered = filtered[filtered["account_scope"].isin(selected_accounts)]
-    if selected_regions:
-        filtered = filtered[filtered["region"].isin(selected_regions)]
-
-    filtered = filtered.sort_values("usage_date")
-    display = filtered.copy()
-    display["usage_date"] = pd.to_datetime(display["usage_date"], errors="coerce").dt.strftime("%Y-%m-%d")
-    display["cost_amount"] = display["cost_amount"].map(lambda v: f"USD {v:,.2f}")
-    st.dataframe(display, use_container_width=True, height=420)
+    # Máscaras combinadas de uma vez: evita uma cópia de DataFrame por filtro
+    masks = [
+        _isin_mask(df[column], selection)
+        for column, selection in (
+            ("service_name", selected_services),
+            ("service_category", selected_categories),
+            ("account_scope", selected_accounts),
+            ("region", selected_regions),
+        )
+        if selection
+    ]
+    filtered = df.loc[np.logical_and.reduce(masks)] if masks else df
+
+    # Frames do fluxo de normalize já chegam ordenados por data (marcador
+    # em attrs); o sort só roda para frames fora desse fluxo
+    if filtered.attrs.get("sorted_by") != "usage_date":
+        filtered = filtered.sort_values("usage_date")
+    # Prévia limitada + colunas cruas com column_config: o frontend formata
+    # a partir dos arrays nativos e o payload não cresce com o dataset
+    if len(filtered) > _PREVIEW_ROWS:
+        st.caption(f"Prévia das primeiras {_PREVIEW_ROWS} de {len(filtered):,} linhas.")
+    st.dataframe(
+        filtered.head(_PREVIEW_ROWS),
+        use_container_width=True,
+        height=420,
+        column_config={
+            "usage_date": st.column_config.DateColumn(format="YYYY-MM-DD"),
+            "cost_amount": st.column_config.NumberColumn(format="USD %.2f"),
+        },
+    )
+    st.download_button(
+        "Baixar CSV completo",
+        data=_csv_bytes(filtered),
+        file_name="detalhamento_operacional.csv",
+        mime="text/csv",
+    )
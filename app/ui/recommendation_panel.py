@@ -1,6 +1,7 @@
 """Painel de recomendações de otimização."""
 from __future__ import annotations
 
+import html
 from typing import Dict
 
 import pandas as pd
@@ -10,6 +11,23 @@ from app.data.repositories import get_percentual_distribution, get_service_total
 from app.services.recommendation_service import generate_recommendations
 
 
+def _frame_digest(df: pd.DataFrame) -> tuple:
+    """Assinatura barata do frame para a chave de cache (shape + colunas + soma)."""
+    return (df.shape, tuple(df.columns), float(df.select_dtypes("number").to_numpy().sum()))
+
+
+@st.cache_data(ttl=3600, show_spinner=False, hash_funcs={pd.DataFrame: _frame_digest})
+def _cached_recommendations(cost_df: pd.DataFrame) -> list:
+    """Agrega e gera recomendações uma vez por recorte do frame."""
+    service_totals = get_service_totals(cost_df)
+    aggregated_data = {
+        "service_totals": service_totals,
+        "distribution": get_percentual_distribution(cost_df),
+        "total_cost": service_totals.sum(),
+    }
+    return generate_recommendations(aggregated_data)
+
+
 def render_recommendation_panel(cost_df: pd.DataFrame) -> None:
     """Renderiza painel de recomendações FinOps."""
     st.markdown("### Recomendações de Otimização")
@@ -19,33 +37,31 @@ def render_recommendation_panel(cost_df: pd.DataFrame) -> None:
         st.info("Sem dados para gerar recomendações.")
         return
 
-    service_totals = get_service_totals(cost_df)
-    distribution = get_percentual_distribution(cost_df)
-    total_cost = service_totals.sum()
-
-    aggregated_data = {
-        "service_totals": service_totals,
-        "distribution": distribution,
-        "total_cost": total_cost,
-    }
-
     with st.spinner("Gerando recomendações..."):
-        recommendations = generate_recommendations(aggregated_data)
+        recommendations = _cached_recommendations(cost_df)
 
     if not recommendations:
         st.info("Nenhuma recomendação específica no momento. Continue monitorando os custos.")
         return
 
-    # Agrupar por impacto
     impact_colors = {"alto": "🔴", "medio": "🟡", "baixo": "🟢"}
 
+    # Um único st.markdown com todos os cards: antes eram ~4 componentes
+    # (container + markdowns/captions) por recomendação a cada rerun.
+    # Os campos vêm do serviço, mas passam por html.escape por segurança
+    cards = []
     for rec in recommendations:
         impact_icon = impact_colors.get(rec.impact, "⚪")
-        with st.container(border=True):
-            st.markdown(f"#### {impact_icon} {rec.title}")
-            st.caption(f"Impacto: {rec.impact.upper()} | Economia estimada: {rec.estimated_saving_percent:.0f}%")
-            st.markdown(rec.description)
-            if rec.service:
-                st.caption(f"Serviço: {rec.service}")
+        service_line = f'<p class="rec-meta">Serviço: {html.escape(rec.service)}</p>' if rec.service else ""
+        cards.append(
+            f'<div class="rec-card">'
+            f"<h4>{impact_icon} {html.escape(rec.title)}</h4>"
+            f'<p class="rec-meta">Impacto: {html.escape(rec.impact.upper())} | '
+            f"Economia estimada: {rec.estimated_saving_percent:.0f}%</p>"
+            f"<p>{html.escape(rec.description)}</p>"
+            f"{service_line}"
+            f"</div>"
+        )
+    st.markdown("\n".join(cards), unsafe_allow_html=True)
 
 
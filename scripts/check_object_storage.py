@@ -0,0 +1,192 @@
+"""Diagnóstico de acesso ao Object Storage da Oracle Cloud (API compatível com S3)."""
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import logging
+import os
+import socket
+import sys
+import threading
+import urllib.parse
+
+# Progresso vai para DEBUG: na execução padrão (INFO) o script só escreve
+# o resultado final, sem pagar um flush de stdout por etapa; LOG_LEVEL=DEBUG
+# recupera o passo a passo quando for preciso diagnosticar
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(message)s",
+)
+log = logging.getLogger("finops")
+
+ORACLE_CLOUD_REGION = os.getenv("ORACLE_CLOUD_REGION", "sa-saopaulo-1")
+ORACLE_CLOUD_ENDPOINT = os.getenv("ORACLE_CLOUD_ENDPOINT")
+ORACLE_CLOUD_BUCKET_NAME = os.getenv("ORACLE_CLOUD_BUCKET_NAME")
+
+# Em vez de passar credenciais como kwargs, os ORACLE_CLOUD_* entram na
+# cadeia padrão do botocore como AWS_*; setdefault preserva AWS_* já
+# definidos no ambiente, então a cadeia (env, perfil, etc.) resolve sem
+# lookups extras por chamada
+if os.getenv("ORACLE_CLOUD_ACCESS_KEY"):
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", os.environ["ORACLE_CLOUD_ACCESS_KEY"])
+if os.getenv("ORACLE_CLOUD_SECRET_KEY"):
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", os.environ["ORACLE_CLOUD_SECRET_KEY"])
+
+# Guard antes do import do boto3: o botocore carrega dezenas de modelos
+# JSON de serviço (centenas de ms); sem credenciais o script sai no tempo
+# de interpretador + print, sem pagar o import do SDK
+if not os.getenv("AWS_ACCESS_KEY_ID") or not os.getenv("AWS_SECRET_ACCESS_KEY"):
+    log.error("Credenciais ausentes: defina ORACLE_CLOUD_ACCESS_KEY e ORACLE_CLOUD_SECRET_KEY.")
+    raise SystemExit(0)
+
+import boto3  # noqa: E402
+from botocore.config import Config  # noqa: E402
+from botocore.exceptions import ClientError, OperationNotPageableError  # noqa: E402
+
+# Retries em modo standard (backoff exponencial com jitter para 503/erros
+# transitórios) e timeouts curtos: endpoint morto falha em segundos em vez
+# de prender sockets pelos 60s default do botocore
+_CLIENT_CONFIG = Config(
+    connect_timeout=3,
+    read_timeout=10,
+    retries={"mode": "standard", "max_attempts": 5},
+    max_pool_connections=50,
+    user_agent_extra="finops-probe/1",
+)
+
+@functools.lru_cache(maxsize=1)
+def get_session():
+    """Devolve a Session memoizada do processo.
+
+    As credenciais vêm da cadeia padrão do botocore (variáveis AWS_*,
+    populadas no topo do módulo); boto3.client() de módulo recriaria a
+    sessão default — e a cadeia de descoberta — a cada chamada.
+    """
+    return boto3.session.Session()
+
+
+def _prewarm_dns(endpoint: str | None) -> None:
+    """Dispara a resolução DNS do host do endpoint numa thread daemon.
+
+    A primeira requisição paga lookup de DNS além do handshake TLS; como o
+    resolver do sistema cacheia o resultado, antecipar o getaddrinfo em
+    background sobrepõe esse custo ao resto da inicialização.
+    """
+    host = urllib.parse.urlsplit(endpoint).hostname if endpoint else None
+    if not host:
+        return
+
+    def _resolve() -> None:
+        try:
+            socket.getaddrinfo(host, 443)
+        except OSError:
+            pass  # sem rede/DNS a requisição real reporta o erro de verdade
+
+    threading.Thread(target=_resolve, daemon=True).start()
+
+
+@functools.lru_cache(maxsize=4)
+def _s3_client(endpoint: str | None, region: str):
+    """Cria (e memoiza) um cliente S3 por par endpoint/região.
+
+    A chave fica só com endpoint e região — as credenciais vêm da Session
+    — então o mesmo cliente e seu pool de conexões urllib3 são reusados
+    por chamadas e threads subsequentes.
+    """
+    client = get_session().client(
+        "s3",
+        region_name=region,
+        endpoint_url=endpoint,
+        config=_CLIENT_CONFIG,
+    )
+    _prewarm_dns(endpoint)
+    return client
+
+
+def get_s3_client():
+    """Devolve o cliente S3 do endpoint configurado no ambiente."""
+    return _s3_client(ORACLE_CLOUD_ENDPOINT, ORACLE_CLOUD_REGION)
+
+
+def _log_client_error(message: str, exc: ClientError) -> None:
+    """Loga erro da API de forma enxuta: código no ERROR, stack só no DEBUG.
+
+    Um traceback de ClientError atravessa ~15 frames de botocore e custa
+    formatação e I/O sem agregar nada — o código do erro (AccessDenied,
+    NoSuchBucket, ...) é o que diz o que fazer.
+    """
+    code = exc.response.get("Error", {}).get("Code", "?")
+    log.error("%s (código S3: %s)", message, code)
+    log.debug("Detalhe do erro:", exc_info=True)
+
+
+def list_bucket_names(s3) -> list[str]:
+    """Lista os buckets visíveis via paginator, com fallback para a chamada simples.
+
+    Contas com muitos buckets estouram o limite de uma resposta única; o
+    paginator itera as páginas sem acumular o XML inteiro em memória. Nem
+    todo endpoint compatível com S3 expõe a operação como pageável, daí o
+    fallback para o list_buckets plano.
+    """
+    try:
+        paginator = s3.get_paginator("list_buckets")
+        return [b["Name"] for page in paginator.paginate() for b in page.get("Buckets", [])]
+    except OperationNotPageableError:
+        return [b["Name"] for b in s3.list_buckets().get("Buckets", [])]
+
+
+def main() -> None:
+    if not ORACLE_CLOUD_ENDPOINT or not ORACLE_CLOUD_BUCKET_NAME:
+        log.error("Configure ORACLE_CLOUD_ENDPOINT e ORACLE_CLOUD_BUCKET_NAME.")
+        raise SystemExit(0)
+
+    s3 = get_s3_client()
+
+    # A listagem de buckets varre a conta inteira e só serve para
+    # diagnóstico; fora do modo verboso o script faz apenas o head_bucket,
+    # que é o que responde a pergunta "tenho acesso?". As sondagens são
+    # independentes e cada uma custa um RTT, então o executor as dispara
+    # em paralelo sobre o mesmo cliente (a API low-level do boto3 é
+    # thread-safe e reusa o pool de conexões)
+    verbose = bool(os.getenv("FINOPS_VERBOSE"))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        buckets_future = executor.submit(list_bucket_names, s3) if verbose else None
+        probe_future = executor.submit(s3.head_bucket, Bucket=ORACLE_CLOUD_BUCKET_NAME)
+
+    if buckets_future is not None:
+        log.debug("Listando buckets visíveis...")
+        try:
+            for name in buckets_future.result():
+                print(f"  - {name}")
+        except ClientError as exc:
+            _log_client_error("Falha ao listar buckets", exc)
+
+    log.debug("Testando acesso ao bucket %s...", ORACLE_CLOUD_BUCKET_NAME)
+    try:
+        # HEAD sem corpo: responde 200/403/404 em ~1 RTT, sem o scan de
+        # chaves nem o XML que o list_objects_v2 de antes produzia
+        probe_future.result()
+        print("✅ Bucket acessível.")
+    except ClientError as exc:
+        _log_client_error("Sem acesso ao bucket informado", exc)
+
+    if "--list" in sys.argv[1:]:
+        log.debug("Amostra de objetos do bucket...")
+        try:
+            paginator = s3.get_paginator("list_objects_v2")
+            pages = paginator.paginate(Bucket=ORACLE_CLOUD_BUCKET_NAME, PaginationConfig={"MaxItems": 5})
+            for page in pages:
+                for obj in page.get("Contents", []):
+                    print(f"  - {obj['Key']}")
+        except ClientError as exc:
+            _log_client_error("Falha ao listar objetos do bucket", exc)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception:
+        # Só o inesperado merece traceback completo; erros da API já saem
+        # resumidos via _log_client_error
+        log.exception("Falha inesperada no diagnóstico.")
+        raise SystemExit(1)